@@ -0,0 +1,242 @@
+import os
+import json
+from datetime import datetime, timezone, timedelta
+import numpy as np
+import pandas as pd
+from lazy_import import lazy_module
+from metrics import error
+from scan_schema import column_name
+
+# Only loaded when an email actually goes out
+ssl = lazy_module("ssl")
+smtplib = lazy_module("smtplib")
+email_message = lazy_module("email.message")
+
+# --- SETTINGS ---
+STATE_FILE = os.path.join("bar_store", "alert_state.json")   # Persisted between runs (cached in CI); one per timeframe
+RULES_FILE = "alert_rules.json"                              # Optional user rules, same format as ALERT_RULES
+DIGEST_MAX_ALERTS = 50                                       # Alerts per email; more are split over several emails
+
+# SMTP settings. For a local stand-in run e.g. `python -m aiosmtpd -n -l localhost:1025`
+# and set EMAIL_SMTP_HOST=localhost EMAIL_SMTP_PORT=1025 EMAIL_SMTP_SSL=0 (no password needed).
+SMTP_HOST = os.environ.get('EMAIL_SMTP_HOST', "smtp.gmail.com")
+SMTP_PORT = int(os.environ.get('EMAIL_SMTP_PORT', 465))
+SMTP_SSL = os.environ.get('EMAIL_SMTP_SSL', "1") != "0"
+
+# Declarative rules, evaluated on every row of the scan table at once.
+#   column:     any column of the scan table (scan_schema.py: levels, SMA/Bollinger bands and the
+#               rsi_signal / trend / bb_status labels; the Hebrew headers are accepted too)
+#   op:         "<" or ">" on numeric columns, "==" or "!=" on label columns
+#               (the alert is ACTIVE while the condition holds)
+#   threshold:  level (or label) that activates the alert
+#   hysteresis: the value must move back past threshold +/- hysteresis before the alert re-arms (numeric only)
+#   cooldown_minutes: minimum time between two notifications of the same rule and coin
+#   tickers / exclude: optional coin filters
+# An alert fires only on the transition inactive -> active, not on every run while it stays active.
+ALERT_RULES = [
+    {"name": "btc_oversold", "column": "rsi", "op": "<", "threshold": 30, "hysteresis": 2,
+     "cooldown_minutes": 360, "tickers": ["BTC-USD"],
+     "message": "🔴 BTC Alert: Oversold! RSI: {value:.2f}"},
+    {"name": "btc_overbought", "column": "rsi", "op": ">", "threshold": 70, "hysteresis": 2,
+     "cooldown_minutes": 360, "tickers": ["BTC-USD"],
+     "message": "🟠 BTC Alert: Overbought! RSI: {value:.2f}"},
+    {"name": "oversold_opportunity", "column": "rsi", "op": "<", "threshold": 30, "hysteresis": 2,
+     "cooldown_minutes": 360, "exclude": ["BTC-USD"],
+     "message": "🟢 Opportunity Alert: {ticker} is Oversold. RSI: {value:.2f}"},
+]
+
+
+# --- RULES AND STATE ---
+def load_rules():
+    if os.path.exists(RULES_FILE):
+        with open(RULES_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return ALERT_RULES
+
+
+def state_path(timeframe="1d"):
+    # Daily keeps the original file name; every other timeframe has its own alert state
+    return STATE_FILE if timeframe == "1d" else STATE_FILE.replace(".json", f"_{timeframe}.json")
+
+
+def load_state(timeframe="1d"):
+    try:
+        with open(state_path(timeframe), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_state(state, timeframe="1d"):
+    path = state_path(timeframe)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, path)
+
+
+# --- FUNCTION: CHECK RULES AGAINST THE TABLE ---
+def rule_problem(rule, df):
+    # Why a rule cannot be evaluated on this table, or None
+    for key in ("name", "column", "op", "threshold", "message"):
+        if key not in rule:
+            return f"missing '{key}'"
+    column = column_name(rule["column"])
+    if column not in df.columns:
+        return f"unknown column '{rule['column']}'"
+    dtype = df[column].dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        if rule["op"] not in ("==", "!="):
+            return f"label column '{column}' takes '==' or '!=', not '{rule['op']}'"
+        if rule["threshold"] not in dtype.categories:
+            return f"'{rule['threshold']}' is not a label of '{column}' ({', '.join(dtype.categories)})"
+    elif rule["op"] not in ("<", ">"):
+        return f"numeric column '{column}' takes '<' or '>', not '{rule['op']}'"
+    elif not isinstance(rule["threshold"], (int, float)):
+        return f"threshold of numeric column '{column}' must be a number"
+    return None
+
+
+def valid_rules(rules, df):
+    # Broken rules (e.g. a typo in alert_rules.json) are reported and skipped; the others still run
+    valid = []
+    for rule in rules:
+        problem = rule_problem(rule, df)
+        if problem:
+            print(f"!!! Alert rule '{rule.get('name', '?')}' skipped: {problem}")
+            error()
+        else:
+            valid.append(rule)
+    return valid
+
+
+# --- FUNCTION: EVALUATE ALL RULES (VECTORIZED PER RULE) ---
+def evaluate_rules(df, rules, state, now=None):
+    # state: {rule name: {ticker: {"active": bool, "last_fired": iso time}}}, updated in place
+    now = now or datetime.now(timezone.utc)
+    tickers = df.index.to_numpy()   # Typed scan table: one row per ticker
+    fired = []
+
+    for rule in valid_rules(rules, df):
+        column = column_name(rule["column"])
+        threshold, hysteresis = rule["threshold"], rule.get("hysteresis", 0)
+        if isinstance(df[column].dtype, pd.CategoricalDtype):
+            # Labels: compared as categorical codes, no hysteresis
+            values = df[column].to_numpy(dtype=object)
+            enter = (df[column] == threshold).to_numpy()
+            enter = enter if rule["op"] == "==" else ~enter & df[column].notna().to_numpy()
+            leave = ~enter
+        else:
+            values = df[column].to_numpy(dtype=float)
+            if rule["op"] == "<":
+                enter, leave = values < threshold, values >= threshold + hysteresis
+            else:
+                enter, leave = values > threshold, values <= threshold - hysteresis
+
+        selected = np.ones(len(tickers), bool)
+        if rule.get("tickers"):
+            selected &= np.isin(tickers, rule["tickers"])
+        if rule.get("exclude"):
+            selected &= ~np.isin(tickers, rule["exclude"])
+
+        rule_state = state.setdefault(rule["name"], {})
+        was_active = np.array([rule_state.get(t, {}).get("active", False) for t in tickers])
+        last_fired = np.array([rule_state.get(t, {}).get("last_fired", "") for t in tickers])
+        # Hysteresis: an active alert stays active until the value clears the band
+        active = np.where(was_active, ~leave, enter) & selected & df[column].notna().to_numpy()
+        cooldown_start = (now - timedelta(minutes=rule.get("cooldown_minutes", 0))).isoformat()
+        fire = active & ~was_active & (last_fired < cooldown_start)
+
+        for i in np.flatnonzero(active | was_active):
+            entry = rule_state.setdefault(tickers[i], {})
+            entry["active"] = bool(active[i])
+            if fire[i]:
+                entry["last_fired"] = now.isoformat()
+                fired.append({"rule": rule["name"], "ticker": tickers[i], "value": values[i],
+                              "text": rule["message"].format(ticker=tickers[i], value=values[i])})
+    return fired
+
+
+# --- DELIVERY: ONE CONNECTION, BATCHED DIGESTS ---
+class EmailDelivery:
+    def __init__(self):
+        self.sender = os.environ.get('EMAIL_SENDER')
+        self.password = os.environ.get('EMAIL_PASSWORD')
+        self.receiver = os.environ.get('EMAIL_RECEIVER')
+        self.smtp = None
+
+    def __enter__(self):
+        if SMTP_SSL:
+            self.smtp = smtplib.SMTP_SSL(SMTP_HOST, SMTP_PORT, context=ssl.create_default_context())
+        else:
+            self.smtp = smtplib.SMTP(SMTP_HOST, SMTP_PORT)
+        if self.password:
+            self.smtp.login(self.sender, self.password)
+        return self
+
+    def __exit__(self, *exc):
+        self.smtp.quit()
+
+    def send(self, subject, body):
+        msg = email_message.EmailMessage()
+        msg.set_content(body)
+        msg['Subject'] = subject
+        msg['From'] = self.sender
+        msg['To'] = self.receiver
+        self.smtp.send_message(msg)
+
+
+def build_digests(fired):
+    digests = []
+    for start in range(0, len(fired), DIGEST_MAX_ALERTS):
+        batch = fired[start:start + DIGEST_MAX_ALERTS]
+        subject = f"🤖 Crypto Alert: {len(batch)} New Events"
+        body = "The monitoring system has detected the following alerts:\n\n"
+        body += "\n".join(a["text"] for a in batch)
+        body += "\n\n-- End of message --"
+        digests.append((subject, body))
+    return digests
+
+
+def deliver(fired):
+    digests = build_digests(fired)
+    for subject, body in digests:
+        print(body)
+
+    delivery = EmailDelivery()
+    if not all([delivery.sender, delivery.receiver]) or (SMTP_SSL and not delivery.password):
+        print("!!! Alert Error: Environment variables (EMAIL_SENDER, EMAIL_PASSWORD, EMAIL_RECEIVER) not set.")
+        print("!!! Make sure you have set up your GitHub Secrets.")
+        return False
+
+    print(f"Preparing to send {len(digests)} email(s) to {delivery.receiver}...")
+    try:
+        with delivery:
+            for subject, body in digests:
+                delivery.send(subject, body)
+        print("--- Email alert sent successfully! ---")
+        return True
+    except Exception as e:
+        print(f"!!! Critical error sending email: {e}")
+        error()
+        return False
+
+
+# --- FUNCTION: FULL ALERT CYCLE ---
+def run_alerts(df, now=None, timeframe="1d"):
+    print(f"\nChecking for alerts ({timeframe} bars)...")
+    state = load_state(timeframe)
+    fired = evaluate_rules(df, load_rules(), state, now)
+
+    if not fired:
+        print("No new alerts.")
+    else:
+        print(f"Found {len(fired)} new alerts. Sending email...")
+        if not deliver(fired):
+            # Not delivered: forget these firings so the next run tries again
+            for alert in fired:
+                state[alert["rule"]][alert["ticker"]].pop("last_fired", None)
+                state[alert["rule"]][alert["ticker"]]["active"] = False
+    save_state(state, timeframe)
+    return fired
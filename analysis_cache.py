@@ -0,0 +1,174 @@
+import os
+import glob
+import json
+import time
+import hashlib
+import threading
+from datetime import datetime, timezone
+import numpy as np
+from lazy_import import lazy_module
+from indicators import classify_rsi, classify_bbands
+
+genai = lazy_module("google.generativeai")
+
+# --- SETTINGS ---
+ANALYSIS_DIR = os.path.join("results", "analyses")   # Committed with the results, so engine-made analyses reach the dashboard
+MAX_ENTRIES = 500            # Analyses kept on disk; the least recently used are evicted
+RSI_BAND_WIDTH = 10          # RSI is bucketed to 10-point bands (e.g. 30-40) for the cache key
+PROMPT_VERSION = 1           # Bump when the prompt changes, so old analyses are not served
+GEMINI_MODEL = "gemini-1.5-flash"
+ANALYSIS_MODEL = os.environ.get("ANALYSIS_MODEL", "gemini")   # "gemini", or "stub" for tests and benchmarks
+
+# Coins offered by the Deep Dive page (display name -> ticker); the engine pre-generates their analyses too
+COIN_LIST = {
+    "Bitcoin (BTC)": "BTC-USD",
+    "Ethereum (ETH)": "ETH-USD",
+    "Solana (SOL)": "SOL-USD",
+    "Cardano (ADA)": "ADA-USD"
+}
+
+# An analysis depends only on the quantized technical state (RSI band, side of SMA 50 / 200,
+# Bollinger status), not on the exact price or RSI. The prompt is built from that state alone, so
+# every visitor and every engine run that sees the same state shares one stored analysis.
+
+
+# --- QUANTIZED STATE ---
+def coin_name(ticker):
+    names = {t: name for name, t in COIN_LIST.items()}
+    return names.get(ticker, ticker.replace("-USD", ""))
+
+
+def technical_state(row, ticker, timeframe):
+    # row: last bar with the add_indicators columns (Close, RSI_14, SMA_50, SMA_200, BBL/BBU_20_2.0)
+    close, rsi = row['Close'], row['RSI_14']
+    band = int(min(np.floor(rsi / RSI_BAND_WIDTH), 100 // RSI_BAND_WIDTH - 1) * RSI_BAND_WIDTH)
+    return {
+        "ticker": ticker,
+        "timeframe": timeframe,
+        "rsi_band": [band, band + RSI_BAND_WIDTH],
+        "rsi_signal": str(classify_rsi(rsi)),
+        "vs_sma50": "above" if close > row['SMA_50'] else "below",
+        "vs_sma200": "above" if close > row['SMA_200'] else "below",
+        "bollinger": str(classify_bbands(close, row['BBL_20_2.0'], row['BBU_20_2.0'])),
+    }
+
+
+def state_key(state, model_name):
+    text = json.dumps({**state, "model": model_name, "prompt_version": PROMPT_VERSION}, sort_keys=True)
+    return hashlib.sha1(text.encode()).hexdigest()[:20]
+
+
+def build_prompt(state):
+    name = coin_name(state["ticker"])
+    low, high = state["rsi_band"]
+    return f"""
+    You are an objective technical crypto market analyst (not a financial advisor).
+    Your job is to interpret cold technical data.
+
+    Analyze the following data for {name} ({state['ticker']}) on {state['timeframe']} bars:
+
+    * **RSI (14):** between {low} and {high} (Meaning: {state['rsi_signal']})
+    * **Relation to SMA 50:** {state['vs_sma50']}
+    * **Relation to SMA 200:** {state['vs_sma200']} (This is a long-term trend indicator)
+    * **Relation to Bollinger Bands:** {state['bollinger']}
+
+    **Your Task:**
+    1. Provide a brief summary (2-3 sentences) of the current technical situation.
+    2. Provide 2-3 bullet points highlighting the strongest Bearish or Bullish signals you see.
+    3. Conclude with a sentence about the expected Volatility (e.g., based on Bollinger Bands).
+
+    Important: Do not give an explicit Buy/Sell/Hold recommendation. Focus only on interpreting the data.
+    Do not quote specific prices. Write the response in Hebrew.
+    """
+
+
+# --- MODEL CLIENTS ---
+class GeminiClient:
+    def __init__(self, api_key, model=GEMINI_MODEL):
+        self.name = model
+        self.api_key = api_key
+        self._model = None
+
+    def generate(self, prompt):
+        if self._model is None:
+            genai.configure(api_key=self.api_key)
+            self._model = genai.GenerativeModel(self.name)
+        # Temperature 0: the same state should give the same analysis
+        response = self._model.generate_content(prompt, generation_config={"temperature": 0})
+        return response.text
+
+
+class StubClient:
+    # Local stand-in: instant (or a fixed delay), deterministic, no API key or network
+    name = "stub"
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = 0
+
+    def generate(self, prompt):
+        self.calls += 1
+        if self.delay:
+            time.sleep(self.delay)
+        digest = hashlib.sha1(prompt.encode()).hexdigest()[:8]
+        return f"Stub analysis {digest}:\n\n" + "\n".join(line.strip() for line in prompt.splitlines() if line.strip().startswith("* "))
+
+
+def make_client(spec=ANALYSIS_MODEL, api_key=None):
+    if spec == "stub":
+        return StubClient()
+    if spec == "gemini":
+        return GeminiClient(api_key)
+    raise ValueError(f"Unknown analysis model '{spec}' (use gemini or stub)")
+
+
+# --- DISK CACHE (LRU BY FILE TIME) ---
+class AnalysisCache:
+    def __init__(self, root=ANALYSIS_DIR, max_entries=MAX_ENTRIES):
+        self.root = root
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+
+    def path(self, key):
+        return os.path.join(self.root, f"{key}.json")
+
+    def get(self, key):
+        path = self.path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        os.utime(path)   # Mark as recently used
+        return entry
+
+    def put(self, key, entry):
+        os.makedirs(self.root, exist_ok=True)
+        path = self.path(key)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, path)
+        with self._lock:
+            # Evict the least recently used analyses beyond max_entries
+            files = sorted(glob.glob(os.path.join(self.root, "*.json")), key=os.path.getmtime)
+            for old in files[:-self.max_entries]:
+                os.remove(old)
+
+    def lookup(self, state, client):
+        return self.get(state_key(state, client.name))
+
+    def analyze(self, state, client):
+        # Returns (entry, hit). Model errors are returned as text but never cached.
+        key = state_key(state, client.name)
+        entry = self.get(key)
+        if entry is not None:
+            return entry, True
+        try:
+            text = client.generate(build_prompt(state))
+        except Exception as e:
+            return {"state": state, "text": f"Error generating analysis: {e}", "model": client.name}, False
+        entry = {"state": state, "text": text, "model": client.name,
+                 "created_at": datetime.now(timezone.utc).isoformat(timespec='seconds')}
+        self.put(key, entry)
+        return entry, False
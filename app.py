@@ -24,6 +24,12 @@ It combines several automated tools to give you a complete picture.
 * **🔬 Advanced Analysis:**
     View correlation analyses and cycle detection (FFT) for the leading coins.
 
+* **🧪 Backtest:**
+    See how the scanner's RSI and trend signals would have performed historically, including a parameter sweep.
+
+* **🩺 Engine Health:**
+    Track every engine run: stage timings, download latency, cache hit rates, errors and memory.
+
 ---
 **How does it work?**
 An automated engine (`engine.py`) runs every 30 minutes via GitHub Actions,
@@ -0,0 +1,216 @@
+import os
+import time
+import argparse
+import itertools
+import numpy as np
+import pandas as pd
+from multiprocessing import shared_memory
+from concurrent.futures import ProcessPoolExecutor
+from indicators import (rsi, sma, classify_rsi, classify_trend,
+                        RSI_OVERBOUGHT, RSI_OVERSOLD, SMA_FAST, SMA_SLOW)
+from output_store import publish
+from timeframes import DEFAULT_TIMEFRAME, TIMEFRAMES, load_timeframe_closes, output_name
+from engine import SCAN_LIST
+
+# --- SETTINGS ---
+BACKTEST_TICKERS = SCAN_LIST   # The scanner's own coins
+OUTPUT_BACKTEST = "backtest"
+MAX_WORKERS = os.cpu_count() or 1
+HORIZONS = [1, 7, 30]          # Forward returns (in bars) measured after every scanner label
+
+# Parameter grid; the scanner's own settings are always part of it
+PARAM_GRID = {
+    "oversold": [20, 25, 30, 35],
+    "overbought": [65, 70, 75, 80],
+    "sma_fast": [20, 50],
+    "sma_slow": [100, 200],
+}
+DEFAULT_PARAMS = {"oversold": RSI_OVERSOLD, "overbought": RSI_OVERBOUGHT, "sma_fast": SMA_FAST, "sma_slow": SMA_SLOW}
+
+# Strategies replay the scanner's labels (indicators.classify_rsi / classify_trend) on every
+# historical bar. A label seen at a bar's close sets the position held over the NEXT bar.
+#   rsi_reversion:  enter on "Oversold", hold until "Overbought"
+#   trend_strong:   long while the trend label is "Strong Bullish"
+#   trend_bullish:  long while the trend label is "Bullish" or "Strong Bullish"
+#   buy_hold:       always long (benchmark)
+STRATEGIES = ["rsi_reversion", "trend_strong", "trend_bullish", "buy_hold"]
+
+# Prices are put in shared memory once; pool workers map the same block instead of
+# receiving a pickled copy per task. Each task is one parameter set over every coin.
+_shared = {}
+
+
+# --- SHARED PRICE MATRIX ---
+def share_prices(values):
+    shm = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+    np.ndarray(values.shape, dtype=values.dtype, buffer=shm.buf)[:] = values
+    return shm
+
+
+def attach_prices(name, shape, dtype):
+    # Pool initializer: keep the handle referenced for the worker's lifetime
+    shm = shared_memory.SharedMemory(name=name)
+    _shared["shm"] = shm
+    _shared["prices"] = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+
+# --- CORE: POSITIONS AND METRICS (VECTORIZED OVER ALL COINS) ---
+def hold_between(enter, leave):
+    # 1 from an entry bar until (excluding) the next exit bar, per column, without a Python loop
+    marks = np.where(enter, 1.0, np.where(leave, 0.0, np.nan))
+    marks[0] = np.where(np.isnan(marks[0]), 0.0, marks[0])
+    return pd.DataFrame(marks).ffill().to_numpy()
+
+
+def cached(key, compute):
+    # Indicators shared by many parameter sets (RSI, each SMA length) are computed once per process
+    cache = _shared.setdefault("indicators", {})
+    if key not in cache:
+        cache[key] = compute()
+    return cache[key]
+
+
+def positions(close, params):
+    rsi_values = cached("rsi", lambda: rsi(close))
+    sma_fast = cached(("sma", params["sma_fast"]), lambda: sma(close, params["sma_fast"]))
+    sma_slow = cached(("sma", params["sma_slow"]), lambda: sma(close, params["sma_slow"]))
+    rsi_label = classify_rsi(rsi_values, params["overbought"], params["oversold"])
+    trend_label = classify_trend(close, sma_fast, sma_slow)
+    trend_ready = np.isfinite(sma_fast) & np.isfinite(sma_slow)
+    # Labels with the bars where their indicators are defined (classify_* labels warm-up bars
+    # "Neutral" / "Bearish", which would bias the signal study)
+    labels = {"rsi_signal": (rsi_label, np.isfinite(rsi_values)), "trend": (trend_label, trend_ready)}
+    return {
+        "rsi_reversion": hold_between(rsi_label == "Oversold", rsi_label == "Overbought"),
+        "trend_strong": ((trend_label == "Strong Bullish") & trend_ready).astype(float),
+        "trend_bullish": (np.isin(trend_label, ["Strong Bullish", "Bullish"]) & trend_ready).astype(float),
+        "buy_hold": np.isfinite(close).astype(float),
+    }, labels
+
+
+def strategy_metrics(close, position):
+    # Bar returns earned by the position taken at the previous close
+    with np.errstate(invalid='ignore', divide='ignore'):
+        bar_ret = np.nan_to_num(close[1:] / close[:-1] - 1.0)
+    held = position[:-1] * np.isfinite(close[1:]) * np.isfinite(close[:-1])
+    strat_ret = held * bar_ret
+    equity = np.cumprod(1.0 + strat_ret, axis=0)
+    drawdown = 1.0 - equity / np.maximum.accumulate(equity, axis=0)
+
+    # Trades: runs of held bars. Per-trade log return by bincount over (coin, trade number).
+    entries = (held > 0) & np.vstack([np.ones((1, held.shape[1]), bool), held[:-1] == 0])
+    trade_no = np.cumsum(entries, axis=0)
+    n_trades = trade_no[-1] if len(trade_no) else np.zeros(held.shape[1], int)
+    in_trade = held > 0
+    cols = np.broadcast_to(np.arange(held.shape[1]), held.shape)
+    stride = int(n_trades.max()) + 1 if len(n_trades) else 1
+    flat_key = (cols * stride + trade_no)[in_trade]
+    trade_log = np.bincount(flat_key, weights=np.log1p(strat_ret[in_trade]), minlength=held.shape[1] * stride)
+    trade_log = trade_log.reshape(held.shape[1], stride)[:, 1:]
+    wins = (trade_log > 0).sum(axis=1)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return {
+            "total_return": (equity[-1] - 1.0) * 100,
+            "max_drawdown": drawdown.max(axis=0) * 100,
+            "exposure": held.mean(axis=0) * 100,
+            "trades": n_trades,
+            "hit_rate": np.where(n_trades > 0, wins / n_trades * 100, np.nan),
+        }
+
+
+def signal_study(close, labels, horizons=HORIZONS):
+    # Forward return after each label, pooled over coins: did the scanner's labels pay off?
+    # labels: {kind: (label matrix, ready mask)}; bars before the indicators are ready are left out
+    rows = []
+    label_masks = {(kind, label): (label_matrix == label) & ready
+                   for kind, (label_matrix, ready) in labels.items() for label in np.unique(label_matrix[ready])}
+    for horizon in horizons:
+        with np.errstate(invalid='ignore', divide='ignore'):
+            forward = np.full(close.shape, np.nan)
+            forward[:-horizon] = (close[horizon:] / close[:-horizon] - 1.0) * 100
+        for (kind, label), label_mask in label_masks.items():
+            mask = label_mask & np.isfinite(forward)
+            values = forward[mask]
+            rows.append({"label_kind": kind, "label": label, "horizon": horizon, "count": int(mask.sum()),
+                         "mean_return": values.mean() if len(values) else np.nan,
+                         "hit_rate": (values > 0).mean() * 100 if len(values) else np.nan})
+    return rows
+
+
+# --- TASK: ONE PARAMETER SET ---
+def run_params(params):
+    close = _shared["prices"]
+    pos, _ = positions(close, params)
+    return params, {name: strategy_metrics(close, pos[name]) for name in STRATEGIES}
+
+
+def param_sets(grid=PARAM_GRID):
+    keys = list(grid)
+    sets = [dict(zip(keys, combo)) for combo in itertools.product(*(grid[k] for k in keys))]
+    sets = [p for p in sets if p["oversold"] < p["overbought"] and p["sma_fast"] < p["sma_slow"]]
+    if DEFAULT_PARAMS not in sets:
+        sets.insert(0, dict(DEFAULT_PARAMS))
+    return sets
+
+
+# --- FUNCTION: FULL BACKTEST ---
+def run_backtest(closes, grid=PARAM_GRID, workers=MAX_WORKERS):
+    values = np.ascontiguousarray(closes.to_numpy(dtype=float))
+    tickers = list(closes.columns)
+    sets = param_sets(grid)
+    start = time.perf_counter()
+    _shared.clear()   # Indicator cache belongs to one price matrix
+
+    if workers > 1 and len(sets) > 1:
+        print(f"... Backtesting {len(sets)} parameter sets x {len(tickers)} coins on {workers} processes")
+        shm = share_prices(values)
+        try:
+            with ProcessPoolExecutor(max_workers=workers, initializer=attach_prices,
+                                     initargs=(shm.name, values.shape, values.dtype)) as pool:
+                outcomes = list(pool.map(run_params, sets, chunksize=max(1, len(sets) // (workers * 4))))
+        finally:
+            shm.close()
+            shm.unlink()
+    else:
+        print(f"... Backtesting {len(sets)} parameter sets x {len(tickers)} coins in-process")
+        _shared["prices"] = values
+        outcomes = [run_params(p) for p in sets]
+
+    # One block of rows (one per coin) per parameter set and strategy
+    runs = pd.concat([pd.DataFrame({"strategy": strategy, **params, "ticker": tickers, **metrics})
+                      for params, by_strategy in outcomes for strategy, metrics in by_strategy.items()],
+                     ignore_index=True)
+
+    # Label study with the scanner's own settings
+    _shared["prices"] = values
+    _, labels = positions(values, DEFAULT_PARAMS)
+    _shared.clear()
+    signals = pd.DataFrame(signal_study(values, labels))
+    seconds = time.perf_counter() - start
+    print(f"... Backtest finished in {seconds:.1f}s")
+    return runs, signals, seconds
+
+
+# --- MAIN ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backtest the scanner's RSI/SMA labels")
+    parser.add_argument("--timeframe", choices=list(TIMEFRAMES), default=DEFAULT_TIMEFRAME)
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS, help="Processes for the parameter sweep (1 = in-process)")
+    parser.add_argument("--no-grid", action="store_true", help="Only the scanner's own settings")
+    args = parser.parse_args()
+
+    print(f"Loading stored {args.timeframe} bars for {len(BACKTEST_TICKERS)} tickers...")
+    closes = load_timeframe_closes(BACKTEST_TICKERS, args.timeframe)
+    if closes.empty:
+        print("!!! No stored bars; run engine.py first to fill the bar store.")
+        raise SystemExit(1)
+
+    grid = {k: [v] for k, v in DEFAULT_PARAMS.items()} if args.no_grid else PARAM_GRID
+    runs, signals, seconds = run_backtest(closes, grid, args.workers)
+    name = output_name(OUTPUT_BACKTEST, args.timeframe)
+    publish(tables={f"{name}_runs": runs, f"{name}_signals": signals},
+            results={name: {"timeframe": args.timeframe, "tickers": list(closes.columns), "bars": len(closes),
+                            "start": str(closes.index[0]), "end": str(closes.index[-1]),
+                            "grid": grid, "default_params": DEFAULT_PARAMS, "horizons": HORIZONS}})
+    print("\n--- Backtest finished ---")
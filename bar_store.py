@@ -0,0 +1,153 @@
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+import pandas as pd
+from data_fetch import fetch_universe, print_fetch_report, fetch_concurrent, print_pipeline_report
+from metrics import cache_hit
+
+try:
+    import fcntl   # Not available on Windows; partitions are then only locked within one process
+except ImportError:
+    fcntl = None
+
+# --- SETTINGS ---
+STORE_DIR = "bar_store"        # One Parquet partition per ticker: bar_store/<interval>/<ticker>.parquet
+INITIAL_HISTORY = "2y"         # History pulled the first time a ticker is seen (longest lookback we use)
+FETCH_MODE = os.environ.get("ENGINE_FETCH_MODE", "batch")   # "batch" or "concurrent"
+
+PERIOD_DAYS = {"5d": 5, "1mo": 31, "3mo": 92, "6mo": 183, "1y": 366, "2y": 731, "5y": 1827}
+
+# A partition is read-merged-rewritten by several writers at once: dashboard refresh threads
+# (15m and 1h are both resampled from the same 5m partition) and the engine daemon. Each merge
+# holds the partition's lock (a thread lock plus an flock on <partition>.lock across processes).
+_partition_locks = {}
+_partition_locks_guard = threading.Lock()
+
+
+# --- HELPERS ---
+def partition_path(ticker, interval="1d"):
+    return os.path.join(STORE_DIR, interval, f"{ticker}.parquet")
+
+
+def period_to_timedelta(period):
+    if period not in PERIOD_DAYS:
+        raise ValueError(f"Unsupported period '{period}'")
+    return pd.Timedelta(days=PERIOD_DAYS[period])
+
+
+@contextmanager
+def partition_lock(ticker, interval="1d"):
+    path = partition_path(ticker, interval)
+    with _partition_locks_guard:
+        lock = _partition_locks.setdefault(path, threading.Lock())
+    with lock:
+        if fcntl is None:
+            yield
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + ".lock", 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def write_partition(ticker, df, interval="1d"):
+    path = partition_path(ticker, interval)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Write to a temp file first so readers never see a half-written partition;
+    # a unique name per writer, so two writers never replace each other's temp file
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=f"{ticker}.", suffix=".tmp")
+    os.close(fd)
+    try:
+        df.to_parquet(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+# --- FUNCTION: READ BARS FROM THE STORE ---
+def load_bars(ticker, period=None, interval="1d"):
+    path = partition_path(ticker, interval)
+    if not os.path.exists(path):
+        return pd.DataFrame()
+    df = pd.read_parquet(path)
+    if period and not df.empty:
+        df = df[df.index >= df.index[-1] - period_to_timedelta(period)]
+    return df
+
+
+def last_timestamp(ticker, interval="1d"):
+    df = load_bars(ticker, interval=interval)
+    return None if df.empty else df.index[-1]
+
+
+# --- FUNCTION: INCREMENTAL UPDATE ---
+def merge_bars(ticker, new_bars, interval="1d"):
+    # Read-merge-write under the partition lock, so concurrent merges never drop each other's bars
+    with partition_lock(ticker, interval):
+        old_bars = load_bars(ticker, interval=interval)
+        merged = pd.concat([old_bars, new_bars]) if not old_bars.empty else new_bars
+        merged = merged[~merged.index.duplicated(keep='last')].sort_index()
+        write_partition(ticker, merged, interval)
+    return merged
+
+
+def update_store(tickers, interval="1d", history=INITIAL_HISTORY, mode=None, on_update=None):
+    # on_update(ticker, bars) is called with the merged history of every ticker that got new bars
+    mode = mode or FETCH_MODE
+    print(f"Updating bar store for {len(tickers)} tickers ({mode} mode)...")
+    new_tickers = []
+    by_start = {}
+
+    for ticker in tickers:
+        last = last_timestamp(ticker, interval)
+        if last is None:
+            new_tickers.append(ticker)
+        else:
+            # Refetch from the last stored bar: today's daily bar is still forming and gets overwritten
+            by_start.setdefault(last.strftime("%Y-%m-%d"), []).append(ticker)
+    # Hit: the ticker is stored and only its newest bars are downloaded
+    cache_hit("bar_store", True, len(tickers) - len(new_tickers))
+    cache_hit("bar_store", False, len(new_tickers))
+
+    def store(ticker, bars):
+        merged = merge_bars(ticker, bars, interval)
+        if on_update is not None:
+            on_update(ticker, merged)
+
+    if mode == "concurrent":
+        # One request per ticker, each with its own range; bars are stored as each download lands
+        requests = {t: {"period": history} for t in new_tickers}
+        requests.update({t: {"start": start} for start, group in by_start.items() for t in group})
+        _, report = fetch_concurrent(requests, process=store, interval=interval)
+        print_pipeline_report(report)
+    else:
+        # 1. Full history only for tickers we have never stored
+        if new_tickers:
+            frames, report = fetch_universe(new_tickers, period=history, interval=interval)
+            print_fetch_report(report)
+            for ticker, df in frames.items():
+                store(ticker, df)
+
+        # 2. Only the newest bars for everything else, one batch per shared start date
+        for start, group in by_start.items():
+            frames, report = fetch_universe(group, period=None, start=start, interval=interval)
+            print_fetch_report(report)
+            for ticker, new_bars in frames.items():
+                store(ticker, new_bars)
+
+    print("Bar store updated.")
+
+
+# --- FUNCTION: WIDE CLOSE MATRIX (DATES x TICKERS) ---
+def load_closes(tickers, period=None, interval="1d"):
+    closes = {}
+    for ticker in tickers:
+        df = load_bars(ticker, period, interval)
+        if not df.empty:
+            closes[ticker] = df['Close']
+    return pd.DataFrame(closes)
@@ -0,0 +1,63 @@
+# Benchmark for the vectorized indicator engine.
+# Run from the repo root:  python -m benchmarks.bench_indicators
+import time
+import numpy as np
+import pandas as pd
+from indicators import scan_table
+
+# --- SETTINGS ---
+N_DAYS = 365
+UNIVERSE_SIZES = [12, 200, 2000, 5000]
+LOOP_LIMIT = 200     # The per-ticker pandas loop gets too slow to be worth timing beyond this
+
+
+# --- HELPERS ---
+def synthetic_closes(n_days, n_tickers, seed=0):
+    rng = np.random.default_rng(seed)
+    log_returns = rng.normal(0.0, 0.03, size=(n_days, n_tickers))
+    start = rng.uniform(0.01, 50000, size=n_tickers)
+    index = pd.date_range(end="2025-01-01", periods=n_days, freq="D")
+    return pd.DataFrame(start * np.exp(np.cumsum(log_returns, axis=0)), index=index,
+                        columns=[f"COIN{i}-USD" for i in range(n_tickers)])
+
+
+def per_ticker_loop(closes):
+    # Old approach: one pandas pipeline per coin (same formulas pandas_ta uses)
+    rows = []
+    for ticker in closes.columns:
+        close = closes[ticker]
+        change = close.diff()
+        gains = change.clip(lower=0).ewm(alpha=1 / 14, min_periods=14).mean()
+        losses = (-change.clip(upper=0)).ewm(alpha=1 / 14, min_periods=14).mean()
+        frame = pd.DataFrame({
+            "Close": close,
+            "RSI_14": 100 * gains / (gains + losses),
+            "SMA_50": close.rolling(50).mean(),
+            "SMA_200": close.rolling(200).mean(),
+        }).dropna()
+        rows.append({"ticker": ticker, "rsi": frame["RSI_14"].iloc[-1]})
+    return pd.DataFrame(rows).set_index("ticker")
+
+
+def best_of(func, *args, repeat=3):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+# --- MAIN ---
+if __name__ == "__main__":
+    print(f"{'tickers':>8} {'vectorized (ms)':>16} {'per coin (us)':>14} {'loop (ms)':>10} {'max RSI diff':>13}")
+    for n_tickers in UNIVERSE_SIZES:
+        closes = synthetic_closes(N_DAYS, n_tickers)
+        vec_time, table = best_of(scan_table, closes)
+        loop_text, diff_text = "-", "-"
+        if n_tickers <= LOOP_LIMIT:
+            loop_time, reference = best_of(per_ticker_loop, closes)
+            loop_text = f"{loop_time * 1000:.1f}"
+            diff_text = f"{np.max(np.abs(table['rsi'] - reference['rsi'])):.1e}"
+        print(f"{n_tickers:>8} {vec_time * 1000:>16.1f} {vec_time / n_tickers * 1e6:>14.1f} {loop_text:>10} {diff_text:>13}")
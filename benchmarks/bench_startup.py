@@ -0,0 +1,98 @@
+# Cold-start benchmark for the engine and the dashboard pages.
+# Run from the repo root:  python -m benchmarks.bench_startup [--report] [--runs 5]
+# Every target is imported in a fresh interpreter. Exits with status 1 if a target's median
+# cold start is above its budget in startup_budget.json, so it can run as a regression check.
+import os
+import ast
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+# --- SETTINGS ---
+BUDGET_FILE = os.path.join(os.path.dirname(__file__), "startup_budget.json")
+DEFAULT_RUNS = 5
+REPORT_TOP = 15     # Slowest modules listed per target with --report
+
+
+# --- TARGETS ---
+def page_import_code(path):
+    # A Streamlit page cannot be imported outside `streamlit run`, so time its top-level imports
+    # (that is what every rerun pays before the first widget is drawn)
+    with open(path, 'r', encoding='utf-8') as f:
+        tree = ast.parse(f.read())
+    imports = [node for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom))]
+    return "\n".join(ast.unparse(node) for node in imports)
+
+
+def startup_targets():
+    targets = {"engine": "import engine"}
+    targets["app"] = page_import_code("app.py")
+    for name in sorted(os.listdir("pages")):
+        if name.endswith(".py"):
+            targets[f"pages/{name}"] = page_import_code(os.path.join("pages", name))
+    return targets
+
+
+# --- MEASUREMENT ---
+def cold_start(code):
+    # Time to run `code` in a fresh interpreter (interpreter start-up itself is not counted)
+    timer = "import time as _t; _s = _t.perf_counter()\n{}\nprint(_t.perf_counter() - _s)"
+    result = subprocess.run([sys.executable, "-c", timer.format(code)], capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr else "import failed")
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def import_time_report(code, top=REPORT_TOP):
+    # Same data as `python -X importtime`, aggregated: (cumulative us, self us, module)
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, module = [part.strip() for part in line[len("import time:"):].split("|")]
+        rows.append((int(cumulative_us), int(self_us), module))
+    # Slowest by cumulative time (a package includes its children); total is the sum of self times
+    return sorted(rows, reverse=True)[:top], sum(r[1] for r in rows)
+
+
+def load_budget():
+    with open(BUDGET_FILE, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+# --- MAIN ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cold-start time of the engine and pages against a budget")
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS)
+    parser.add_argument("--report", action="store_true", help="List the slowest imports of every target")
+    args = parser.parse_args()
+
+    budget = load_budget()
+    failures = []
+    print(f"{'target':<28} {'median (ms)':>12} {'budget (ms)':>12}  status")
+    for target, code in startup_targets().items():
+        limit = budget.get(target, budget.get("default"))
+        try:
+            median = statistics.median(cold_start(code) for _ in range(args.runs)) * 1000
+        except RuntimeError as e:
+            print(f"{target:<28} {'-':>12} {limit:>12}  !!! {e}")
+            failures.append(target)
+            continue
+        status = "ok" if limit is None or median <= limit else "OVER BUDGET"
+        if status != "ok":
+            failures.append(target)
+        print(f"{target:<28} {median:>12.0f} {limit:>12}  {status}")
+
+        if args.report:
+            rows, total_us = import_time_report(code)
+            print(f"    -X importtime: {total_us / 1000:.0f} ms total")
+            for cumulative_us, self_us, module in rows:
+                print(f"    {cumulative_us / 1000:>9.1f} ms  {module}")
+
+    if failures:
+        print(f"\n!!! Startup budget exceeded or import failed: {', '.join(failures)}")
+        sys.exit(1)
+    print("\nAll targets within the startup budget.")
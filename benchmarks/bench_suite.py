@@ -0,0 +1,178 @@
+# Offline benchmark suite for the engine's hot paths, on deterministic synthetic data.
+# Run from the repo root:
+#   python -m benchmarks.bench_suite                 compare against benchmarks/baseline.json
+#   python -m benchmarks.bench_suite --save          record a new baseline (do this on the machine that checks)
+#   python -m benchmarks.bench_suite --sizes 12 200 --only correlation fft
+# Exits with status 1 if any benchmark is slower than its baseline by more than the tolerance.
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+from datetime import datetime, timezone
+import numpy as np
+import pandas as pd
+import output_store
+from data_sources import SyntheticSource
+from indicators import scan_table
+from indicator_state import StreamingIndicators
+from alerts import evaluate_rules, ALERT_RULES
+from correlation import correlation_matrices
+from spectral import common_window, amplitude_spectrum, welch_spectrum, spectrogram
+from scan_schema import scan_frame
+
+# --- SETTINGS ---
+BASELINE_FILE = os.path.join(os.path.dirname(__file__), "baseline.json")
+SIZES = [12, 200, 2000]
+REPEAT = 5              # Best of N runs
+TIME_BUDGET = 20.0      # Seconds per benchmark before it stops repeating
+TOLERANCE = 0.5         # Allowed slowdown vs the baseline (0.5 = 50%)
+MIN_SLOWDOWN = 0.010    # Seconds; differences below this are timer noise, never a regression
+
+
+# --- DATA ---
+def synthetic_closes(n_tickers, period="2y"):
+    # Same generator the engine uses with ENGINE_DATA_SOURCE=synthetic, so results are reproducible
+    source = SyntheticSource()
+    tickers = [f"COIN{i}-USD" for i in range(n_tickers)]
+    raw = source.download(tickers, period=period)
+    return pd.DataFrame({t: raw[t]['Close'] for t in tickers})
+
+
+# --- BENCHMARKS: name -> setup(closes_2y) returning the function to time ---
+def bench_indicators(closes):
+    closes_1y = closes.iloc[-366:]
+    return lambda: scan_table(closes_1y)
+
+
+def bench_streaming(closes):
+    state = StreamingIndicators()
+    live = state.catch_up(closes.iloc[-366:])
+    return lambda: state.latest(live)
+
+
+def bench_alerts(closes):
+    df = scan_frame(scan_table(closes.iloc[-366:]))
+    now = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    return lambda: evaluate_rules(df, ALERT_RULES, {}, now)
+
+
+def bench_correlation(closes):
+    returns = closes.iloc[-366:].pct_change(fill_method=None).iloc[1:]
+    return lambda: correlation_matrices(returns)
+
+
+def bench_fft(closes):
+    def run():
+        values, _ = common_window(closes)
+        return amplitude_spectrum(values), welch_spectrum(values), spectrogram(values)
+    return run
+
+
+def bench_serialization(closes):
+    # Full publish (Arrow table + .npy arrays + manifest) and read-back, into a scratch folder
+    table = scan_frame(scan_table(closes.iloc[-366:]))
+    _, upper, _ = correlation_matrices(closes.iloc[-91:].pct_change(fill_method=None).iloc[1:], [30])
+    freqs, amplitude = amplitude_spectrum(common_window(closes)[0])
+    results = {"correlation": {"windows": {"30": upper[30]}}, "spectral": {"periods": 1 / freqs, "amplitude": amplitude.T}}
+    folder = tempfile.mkdtemp(prefix="bench_results_")
+
+    def run():
+        shutil.rmtree(folder, ignore_errors=True)
+        output_store.RESULTS_DIR = folder
+        output_store.MANIFEST_FILE = os.path.join(folder, "manifest.json")
+        output_store.publish(tables={"scan": table}, results={"analysis": results}, delta=False)
+        output_store.load_table("scan")
+        output_store.load_results("analysis", mmap=False)
+    return run
+
+
+BENCHMARKS = {
+    "indicators": bench_indicators,
+    "streaming": bench_streaming,
+    "alerts": bench_alerts,
+    "correlation": bench_correlation,
+    "fft": bench_fft,
+    "serialization": bench_serialization,
+}
+
+
+# --- TIMING ---
+def best_of(func, repeat=REPEAT, budget=TIME_BUDGET):
+    # Best of `repeat` timed runs after one warm-up (first-call costs like lazy imports are not what
+    # we track); slow cases stop early once `budget` seconds are spent, keeping at least one run
+    times = []
+    for _ in range(repeat + 1):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+        if sum(times) > budget:
+            break
+    return min(times[1:] or times)
+
+
+def quiet(func):
+    # publish() and friends print progress lines; keep the benchmark table readable
+    def run():
+        stdout, sys.stdout = sys.stdout, open(os.devnull, 'w')
+        try:
+            return func()
+        finally:
+            sys.stdout.close()
+            sys.stdout = stdout
+    return run
+
+
+def load_baseline():
+    try:
+        with open(BASELINE_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"results": {}}
+
+
+# --- MAIN ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline benchmarks for the engine's hot paths")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS), default=list(BENCHMARKS))
+    parser.add_argument("--save", action="store_true", help="Write the timings as the new baseline")
+    parser.add_argument("--repeat", type=int, default=REPEAT)
+    args = parser.parse_args()
+
+    original_results_dir = output_store.RESULTS_DIR, output_store.MANIFEST_FILE
+    baseline = load_baseline()
+    timings, regressions = {}, []
+    print(f"{'benchmark':<14} {'tickers':>8} {'time (ms)':>10} {'baseline':>10} {'change':>8}")
+    for size in args.sizes:
+        closes = synthetic_closes(size)
+        for name in args.only:
+            seconds = best_of(quiet(BENCHMARKS[name](closes)), args.repeat)
+            timings.setdefault(name, {})[str(size)] = round(seconds, 6)
+            base = baseline["results"].get(name, {}).get(str(size))
+            change = "-"
+            if base:
+                change = f"{(seconds / base - 1) * 100:+.0f}%"
+                if seconds > base * (1 + TOLERANCE) and seconds - base > MIN_SLOWDOWN:
+                    regressions.append(f"{name}@{size}")
+                    change += " !!!"
+            base_text = f"{base * 1000:.1f}" if base else "-"
+            print(f"{name:<14} {size:>8} {seconds * 1000:>10.1f} {base_text:>10} {change:>8}")
+    output_store.RESULTS_DIR, output_store.MANIFEST_FILE = original_results_dir
+
+    if args.save:
+        for name, by_size in timings.items():
+            baseline["results"].setdefault(name, {}).update(by_size)
+        baseline["machine"] = f"{platform.machine()} / {platform.python_version()} / numpy {np.__version__} / pandas {pd.__version__}"
+        baseline["recorded_at"] = datetime.now(timezone.utc).isoformat(timespec='seconds')
+        with open(BASELINE_FILE, 'w', encoding='utf-8') as f:
+            json.dump(baseline, f, indent=2)
+        print(f"\nBaseline written to {BASELINE_FILE}")
+    elif regressions:
+        print(f"\n!!! Slower than baseline by more than {TOLERANCE:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+    else:
+        print("\nNo regressions against the baseline.")
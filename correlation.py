@@ -0,0 +1,96 @@
+import numpy as np
+
+# --- SETTINGS ---
+CORR_WINDOWS = [7, 30, 90]   # Rolling windows in bars (days on the daily timeframe)
+SERIES_STEP = 5              # Bars between points of the mean-correlation history
+SERIES_TICKERS = 200         # The history is the mean over the first SERIES_TICKERS coins (BTC, ETH, ... first):
+                             # every point costs N x N, while the published matrices always cover every coin
+
+# Rolling correlation for every pair at once. Per window we keep running sums
+#   n_ij (pairs seen), Sx_ij (x_i where j is also present), Sxx_ij and Sxy_ij
+# and slide them forward: add the entering rows' outer products, subtract the rows leaving.
+# That is a few matrix products per step for all pairs, instead of one pandas rolling().corr() per pair.
+# Missing returns (coins listed later) are handled pairwise, like pandas.
+
+
+# --- CORE: OUTER-PRODUCT SUMS OF ONE OR MORE ROWS ---
+def pair_sums(rows):
+    rows = np.atleast_2d(rows)
+    mask = np.isfinite(rows).astype(float)
+    x = np.where(mask > 0, rows, 0.0)
+    return {
+        "n": mask.T @ mask,
+        "sx": x.T @ mask,
+        "sxx": (x ** 2).T @ mask,
+        "sxy": x.T @ x,
+    }
+
+
+def corr_from_sums(sums, min_periods):
+    n, sx, sxx, sxy = sums["n"], sums["sx"], sums["sxx"], sums["sxy"]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cov = n * sxy - sx * sx.T
+        var_i = n * sxx - sx ** 2
+        corr = cov / np.sqrt(var_i * var_i.T)
+    corr[n < min_periods] = np.nan
+    return np.clip(corr, -1.0, 1.0)
+
+
+# --- FUNCTION: ROLLING MATRIX FOR ONE WINDOW ---
+def rolling_correlation(returns, window, step=SERIES_STEP):
+    # returns: 2-D array (bars x tickers).
+    # Gives the latest N x N matrix plus the mean pairwise correlation every `step` bars
+    # (NaN in between, and for bars before the first full window).
+    n_rows, n_cols = returns.shape
+    step = min(step, window)
+    upper = np.triu_indices(n_cols, k=1)
+    mean_corr = np.full(n_rows, np.nan)
+    if n_rows < window:
+        return np.full((n_cols, n_cols), np.nan), mean_corr
+
+    def record(t, sums):
+        if n_cols > 1:
+            with np.errstate(all='ignore'):
+                mean_corr[t] = np.nanmean(corr_from_sums(sums, window)[upper])
+
+    sums = pair_sums(returns[:window])
+    record(window - 1, sums)
+    for t in range(window - 1 + step, n_rows, step):
+        entering = pair_sums(returns[t - step + 1:t + 1])
+        leaving = pair_sums(returns[t - step + 1 - window:t + 1 - window])
+        for key in sums:
+            sums[key] += entering[key] - leaving[key]
+        record(t, sums)
+
+    # Exact recompute for the published matrix so sliding round-off never reaches the output
+    latest = corr_from_sums(pair_sums(returns[-window:]), window)
+    return latest, mean_corr
+
+
+# --- FUNCTION: ALL WINDOWS, COMPACT OUTPUT ---
+def correlation_matrices(returns, windows=CORR_WINDOWS, series_tickers=SERIES_TICKERS):
+    values = returns.to_numpy(dtype=float)
+    upper = np.triu_indices(values.shape[1], k=1)
+    matrices, upper_triangles, mean_series = {}, {}, {}
+    for window in windows:
+        if values.shape[1] <= series_tickers:
+            latest, mean_corr = rolling_correlation(values, window)
+        else:
+            # History on the fixed sample, latest matrix exact over every coin
+            _, mean_corr = rolling_correlation(values[:, :series_tickers], window)
+            latest = corr_from_sums(pair_sums(values[-window:]), window)
+        np.fill_diagonal(latest, 1.0)
+        matrices[window] = latest
+        # Upper triangle only, as float32: N*(N-1)/2 values instead of N*N doubles
+        upper_triangles[window] = latest[upper].astype(np.float32)
+        mean_series[window] = mean_corr.astype(np.float32)
+    return matrices, upper_triangles, mean_series
+
+
+def matrix_from_upper(values, n_tickers):
+    # Rebuild the full symmetric matrix from a stored upper triangle
+    matrix = np.eye(n_tickers)
+    upper = np.triu_indices(n_tickers, k=1)
+    matrix[upper] = values
+    matrix.T[upper] = values
+    return matrix
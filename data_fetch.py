@@ -0,0 +1,206 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import pandas as pd
+from data_sources import get_source   # yfinance by default; synthetic / fixtures for offline runs
+from metrics import record_fetch, frame_bytes, error
+
+# --- SETTINGS ---
+CHUNK_SIZE = 100      # Tickers per batched request (Yahoo handles ~100 symbols per call comfortably)
+MAX_RETRIES = 2       # Extra attempts for tickers that came back empty from a batch
+RETRY_DELAY = 1.0     # Seconds to wait before the first retry (doubles on every attempt)
+
+# Concurrent mode, for requests that cannot share one batch (e.g. every ticker needs its own start date)
+MAX_WORKERS = 8       # Downloads in flight at the same time
+RATE_LIMIT = 4.0      # Requests per second allowed by the token bucket
+RATE_BURST = 8        # Requests that may go out back-to-back before the rate limit kicks in
+REQUEST_TIMEOUT = 10  # Seconds before a single download is abandoned
+
+
+# --- HELPER: SPLIT A BATCHED DOWNLOAD INTO PER-TICKER FRAMES ---
+def split_batch(raw, tickers):
+    frames = {}
+    if raw is None or raw.empty:
+        return frames
+
+    for ticker in tickers:
+        # group_by='ticker' gives (ticker, field) columns, even for a single symbol
+        if isinstance(raw.columns, pd.MultiIndex):
+            if ticker not in raw.columns.get_level_values(0):
+                continue
+            frame = raw[ticker]
+        else:
+            frame = raw
+        frame = frame.dropna(how='all')
+        if not frame.empty:
+            frames[ticker] = frame.copy()
+    return frames
+
+
+# --- FUNCTION: BATCHED DOWNLOAD FOR A WHOLE UNIVERSE ---
+def fetch_universe(tickers, period="1y", chunk_size=CHUNK_SIZE, max_retries=MAX_RETRIES, **kwargs):
+    start_time = time.perf_counter()
+    report = {"tickers": len(tickers), "round_trips": 0, "chunks": [], "retried": [], "failed": []}
+    frames = {}
+    # Either a relative period ("1y") or explicit start/end dates passed through kwargs
+    if period:
+        kwargs['period'] = period
+
+    # 1. One batched request per chunk instead of one request per ticker
+    for i in range(0, len(tickers), chunk_size):
+        chunk = list(tickers[i:i + chunk_size])
+        chunk_start = time.perf_counter()
+        try:
+            raw = get_source().download(chunk, progress=False, group_by='ticker', threads=True, **kwargs)
+        except Exception as e:
+            print(f"!!! Error downloading batch {chunk[0]}..{chunk[-1]}: {e}")
+            error()
+            raw = None
+        report["round_trips"] += 1
+        chunk_frames = split_batch(raw, chunk)
+        frames.update(chunk_frames)
+        chunk_seconds = time.perf_counter() - chunk_start
+        report["chunks"].append({"size": len(chunk), "seconds": chunk_seconds})
+        # Every ticker of a batch waited for the whole request
+        for ticker, frame in chunk_frames.items():
+            record_fetch(ticker, chunk_seconds, frame_bytes(frame))
+
+    # 2. Retry only the tickers that failed, one by one, with exponential backoff
+    missing = [t for t in tickers if t not in frames]
+    report["retried"] = list(missing)
+    delay = RETRY_DELAY
+    for attempt in range(max_retries):
+        if not missing:
+            break
+        time.sleep(delay)
+        delay *= 2
+        for ticker in missing:
+            report["round_trips"] += 1
+            retry_start = time.perf_counter()
+            try:
+                raw = get_source().download([ticker], progress=False, group_by='ticker', **kwargs)
+                frames.update(split_batch(raw, [ticker]))
+            except Exception as e:
+                print(f"!!! Retry {attempt + 1} failed for {ticker}: {e}")
+            record_fetch(ticker, time.perf_counter() - retry_start, frame_bytes(frames.get(ticker)))
+        missing = [t for t in missing if t not in frames]
+
+    report["failed"] = missing
+    error(len(missing))
+    report["seconds"] = time.perf_counter() - start_time
+    return frames, report
+
+
+# --- FUNCTION: PRINT TIMING REPORT ---
+def print_fetch_report(report):
+    print(f"... Fetched {report['tickers'] - len(report['failed'])}/{report['tickers']} tickers "
+          f"in {report['seconds']:.2f}s using {report['round_trips']} round-trip(s) "
+          f"({len(report['chunks'])} batch(es), {len(report['retried'])} retried)")
+    for i, chunk in enumerate(report["chunks"]):
+        print(f"    batch {i + 1}: {chunk['size']} tickers in {chunk['seconds']:.2f}s")
+    if report["failed"]:
+        print(f"!!! Failed after retries: {', '.join(report['failed'])}")
+
+
+# --- RATE LIMITER ---
+class TokenBucket:
+    def __init__(self, rate=RATE_LIMIT, burst=RATE_BURST):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        # Block until a token is available; returns the seconds spent waiting
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+
+# --- FUNCTION: ONE TICKER WITH RETRIES ---
+def fetch_ticker(ticker, bucket, max_retries=MAX_RETRIES, timeout=REQUEST_TIMEOUT, **kwargs):
+    delay = RETRY_DELAY
+    last_error = None
+    for attempt in range(max_retries + 1):
+        bucket.acquire()
+        try:
+            raw = get_source().download([ticker], progress=False, group_by='ticker', threads=False, timeout=timeout, **kwargs)
+            frame = split_batch(raw, [ticker]).get(ticker)
+            if frame is not None:
+                return frame, attempt
+            last_error = "empty response"
+        except Exception as e:
+            last_error = e
+        if attempt < max_retries:
+            time.sleep(delay)
+            delay *= 2
+    raise RuntimeError(f"{ticker}: {last_error}")
+
+
+# --- FUNCTION: CONCURRENT FETCH -> PROCESS PIPELINE ---
+def fetch_concurrent(requests, process=None, max_workers=MAX_WORKERS, bucket=None, **kwargs):
+    # requests: {ticker: extra download kwargs (e.g. its own start date)}
+    # process(ticker, frame) runs as soon as each download lands, so compute overlaps the I/O still in flight
+    bucket = bucket or TokenBucket()
+    start_time = time.perf_counter()
+    report = {"tickers": len(requests), "round_trips": 0, "retried": [], "failed": [],
+              "fetch_seconds": {}, "process_seconds": {}}
+    frames = {}
+
+    def timed_fetch(ticker, ticker_kwargs):
+        fetch_start = time.perf_counter()
+        frame, retries = fetch_ticker(ticker, bucket, **kwargs, **ticker_kwargs)
+        return frame, retries, time.perf_counter() - fetch_start
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(timed_fetch, t, kw): t for t, kw in requests.items()}
+        for future in as_completed(futures):
+            ticker = futures[future]
+            try:
+                frame, retries, seconds = future.result()
+            except Exception as e:
+                print(f"!!! Error fetching {ticker}: {e}")
+                error()
+                report["failed"].append(ticker)
+                continue
+            report["round_trips"] += retries + 1
+            if retries:
+                report["retried"].append(ticker)
+            report["fetch_seconds"][ticker] = seconds
+            record_fetch(ticker, seconds, frame_bytes(frame))
+            frames[ticker] = frame
+            if process is not None:
+                process_start = time.perf_counter()
+                try:
+                    process(ticker, frame)
+                except Exception as e:
+                    print(f"!!! Error processing {ticker}: {e}")
+                    error()
+                report["process_seconds"][ticker] = time.perf_counter() - process_start
+
+    report["seconds"] = time.perf_counter() - start_time
+    return frames, report
+
+
+def print_pipeline_report(report):
+    fetch_times = list(report["fetch_seconds"].values())
+    process_times = list(report["process_seconds"].values())
+    print(f"... Pipeline: {len(fetch_times)}/{report['tickers']} tickers in {report['seconds']:.2f}s wall, "
+          f"{report['round_trips']} request(s), {len(report['retried'])} retried")
+    if fetch_times:
+        print(f"    fetch:   total {sum(fetch_times):.2f}s, mean {sum(fetch_times) / len(fetch_times):.3f}s, "
+              f"max {max(fetch_times):.3f}s")
+    if process_times:
+        print(f"    process: total {sum(process_times):.2f}s, mean {sum(process_times) / len(process_times):.3f}s")
+    if report["failed"]:
+        print(f"!!! Failed after retries: {', '.join(report['failed'])}")
@@ -0,0 +1,119 @@
+import time
+import threading
+from bar_store import period_to_timedelta
+from indicators import add_indicators
+from timeframes import DEFAULT_TIMEFRAME, update_timeframe_store, load_timeframe_bars, source_interval
+
+# --- SETTINGS ---
+REFRESH_SECONDS = 300      # A ticker's bars are refreshed in the background once they are older than this
+COLD_WAIT_SECONDS = 30     # Longest a request waits when a ticker has no stored bars at all
+
+# Process-wide bar + indicator cache for the dashboard (the pages hold one instance via
+# st.cache_resource, so it is shared by every session and every rerun).
+# Per (ticker, timeframe) we keep ONE frame: the full stored history with indicators computed
+# once (coarser timeframes are resampled from the stored finer bars). A period is served as a
+# positional slice of that frame (a view, no copy), so 1y / 6mo / 3mo / 1mo of a coin cost
+# one download and one indicator pass.
+# Requests never wait for the network: they get the frame currently held (from memory or
+# the local bar store) and, if it is stale, a background thread refreshes it and swaps
+# in the new frame. Frames are never modified after they are published.
+# One refresh runs per stored partition (ticker, source interval): 15m and 1h of a coin share
+# the download of its 5m bars, and the refresh rebuilds every timeframe that asked for it.
+
+
+class DataService:
+    def __init__(self, refresh_seconds=REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self._frames = {}          # (ticker, timeframe) -> DataFrame (bars + indicators, full history)
+        self._refreshed = {}       # (ticker, timeframe) -> time.monotonic() of the last finished refresh
+        self._refreshing = {}      # (ticker, source interval) -> (threading.Event set when it ends, timeframes to rebuild)
+        self._lock = threading.Lock()
+
+    # --- BUILD AND REFRESH ---
+    def _build(self, key):
+        df = load_timeframe_bars(*key)
+        if df.empty:
+            return None
+        return add_indicators(df).dropna()
+
+    def _refresh(self, source_key, done, timeframes):
+        ticker = source_key[0]
+        built = set()
+        try:
+            update_timeframe_store([ticker], source_key[1])   # A source interval is its own timeframe
+            while True:
+                # Timeframes may join while we build; the refresh ends once none is left
+                with self._lock:
+                    pending = timeframes - built
+                    if not pending:
+                        self._refreshing.pop(source_key, None)
+                        break
+                for timeframe in pending:
+                    key = (ticker, timeframe)
+                    frame = self._build(key)
+                    with self._lock:
+                        if frame is not None:
+                            self._frames[key] = frame
+                        self._refreshed[key] = time.monotonic()
+                    built.add(timeframe)
+        except Exception as e:
+            print(f"!!! Background refresh of {ticker} ({source_key[1]}) failed: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.pop(source_key, None)
+            done.set()
+
+    def refresh_async(self, ticker, timeframe=DEFAULT_TIMEFRAME):
+        # Start a refresh unless one is already running for this ticker's stored bars; returns its Event
+        source_key = (ticker, source_interval(timeframe))
+        with self._lock:
+            running = self._refreshing.get(source_key)
+            if running is None:
+                running = self._refreshing[source_key] = (threading.Event(), {timeframe})
+                threading.Thread(target=self._refresh, args=(source_key, *running),
+                                 name=f"refresh-{ticker}-{source_key[1]}", daemon=True).start()
+            else:
+                running[1].add(timeframe)
+        return running[0]
+
+    def _is_stale(self, key):
+        last = self._refreshed.get(key)
+        return last is None or time.monotonic() - last > self.refresh_seconds
+
+    # --- READ ---
+    def frame(self, ticker, timeframe=DEFAULT_TIMEFRAME):
+        key = (ticker, timeframe)
+        with self._lock:
+            df = self._frames.get(key)
+        if df is None:
+            # First request for this ticker in this process: serve the local store right away
+            df = self._build(key)
+            if df is not None:
+                with self._lock:
+                    df = self._frames.setdefault(key, df)
+        if self._is_stale(key):
+            done = self.refresh_async(ticker, timeframe)
+            if df is None:
+                # Nothing stored yet, so there is nothing to serve until the first download lands
+                done.wait(COLD_WAIT_SECONDS)
+                with self._lock:
+                    df = self._frames.get(key)
+        return df
+
+    def get(self, ticker, period=None, timeframe=DEFAULT_TIMEFRAME):
+        df = self.frame(ticker, timeframe)
+        if df is None or df.empty or period is None:
+            return df
+        # Positional slice of the shared frame: a view, not a copy. Callers must not modify it.
+        start = df.index.searchsorted(df.index[-1] - period_to_timedelta(period))
+        return df.iloc[start:]
+
+    def warm(self, tickers, timeframe=DEFAULT_TIMEFRAME):
+        # Refresh a set of tickers in the background (e.g. everything a page can show)
+        for ticker in tickers:
+            if self._is_stale((ticker, timeframe)):
+                self.refresh_async(ticker, timeframe)
+
+    def age_seconds(self, ticker, timeframe=DEFAULT_TIMEFRAME):
+        last = self._refreshed.get((ticker, timeframe))
+        return None if last is None else time.monotonic() - last
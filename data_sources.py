@@ -0,0 +1,166 @@
+import os
+import zlib
+import numpy as np
+import pandas as pd
+from lazy_import import lazy_module
+
+yf = lazy_module("yfinance")
+
+# --- SETTINGS ---
+# Which backend data_fetch downloads from: "yfinance" (default), "synthetic", "fixture:<dir>"
+# (replay recorded bars) or "record:<dir>" (download from Yahoo and record them as fixtures)
+DATA_SOURCE = os.environ.get("ENGINE_DATA_SOURCE", "yfinance")
+SYNTHETIC_END = pd.Timestamp("2025-01-01")   # Fixed, so synthetic runs are reproducible
+SYNTHETIC_VOLATILITY = 0.03                  # Daily log-return std; scaled down for shorter bars
+
+# A data source is any object with
+#   download(tickers, period=None, start=None, interval="1d", **kwargs) -> DataFrame
+# returning what yf.download(..., group_by='ticker') returns: a DatetimeIndex and
+# (ticker, field) columns with Open/High/Low/Close/Volume. Tickers it cannot serve are left out.
+# data_fetch only talks to the current source, so the whole engine can run offline and
+# deterministically (benchmarks, fixtures) without touching the network.
+
+INTERVAL_MINUTES = {"1m": 1, "5m": 5, "15m": 15, "1h": 60, "1d": 1440}
+
+
+# --- HELPERS ---
+def request_start(period=None, start=None, end=None):
+    from bar_store import period_to_timedelta   # bar_store imports data_fetch, which imports this module
+    if start is not None:
+        return pd.Timestamp(start)
+    return pd.Timestamp(end) - period_to_timedelta(period or "1y")
+
+
+def combine(frames):
+    # {ticker: OHLCV frame} -> one frame with (ticker, field) columns, like a batched download
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames, axis=1)
+
+
+# --- BACKEND: YAHOO FINANCE ---
+class YFinanceSource:
+    name = "yfinance"
+
+    def download(self, tickers, **kwargs):
+        return yf.download(tickers, **kwargs)
+
+
+# --- BACKEND: SYNTHETIC (DETERMINISTIC RANDOM WALKS) ---
+class SyntheticSource:
+    # Every (ticker, interval) gets one fixed random walk ending at SYNTHETIC_END; requests are
+    # slices of it, so incremental updates line up with earlier downloads exactly.
+    name = "synthetic"
+
+    def __init__(self, end=SYNTHETIC_END, history_days=3 * 365, missing=()):
+        self.end = pd.Timestamp(end)
+        self.history_days = history_days
+        self.missing = set(missing)   # Tickers that "fail", to exercise retries and reports
+        self._series = {}
+
+    def series(self, ticker, interval="1d"):
+        key = (ticker, interval)
+        if key not in self._series:
+            minutes = INTERVAL_MINUTES[interval]
+            # Intraday history is short at the source too; cap it like Yahoo does
+            days = self.history_days if minutes >= 1440 else min(self.history_days, 60)
+            index = pd.date_range(end=self.end, periods=days * 1440 // minutes, freq=f"{minutes}min")
+            rng = np.random.default_rng([zlib.crc32(ticker.encode()), minutes])
+            sigma = SYNTHETIC_VOLATILITY * np.sqrt(minutes / 1440)
+            close = rng.uniform(0.05, 50000) * np.exp(np.cumsum(rng.normal(0.0, sigma, len(index))))
+            spread = np.abs(rng.normal(0.0, sigma, len(index)))
+            open_ = np.concatenate([[close[0]], close[:-1]])
+            self._series[key] = pd.DataFrame({
+                'Open': open_,
+                'High': np.maximum(open_, close) * (1 + spread),
+                'Low': np.minimum(open_, close) * (1 - spread),
+                'Close': close,
+                'Volume': rng.uniform(1e5, 1e8, len(index)).round(),
+            }, index=index)
+        return self._series[key]
+
+    def download(self, tickers, period=None, start=None, end=None, interval="1d", **kwargs):
+        first = request_start(period, start, end or self.end)
+        frames = {}
+        for ticker in ([tickers] if isinstance(tickers, str) else tickers):
+            if ticker in self.missing:
+                continue
+            df = self.series(ticker, interval)
+            frames[ticker] = df[df.index >= first]
+        return combine(frames)
+
+
+# --- BACKEND: RECORDED FIXTURES ---
+class FixtureSource:
+    # Replays bars recorded earlier (see RecordingSource). Layout: <root>/<interval>/<ticker>.parquet
+    name = "fixture"
+
+    def __init__(self, root):
+        self.root = root
+
+    def path(self, ticker, interval):
+        return os.path.join(self.root, interval, f"{ticker}.parquet")
+
+    def download(self, tickers, period=None, start=None, end=None, interval="1d", **kwargs):
+        frames = {}
+        for ticker in ([tickers] if isinstance(tickers, str) else tickers):
+            path = self.path(ticker, interval)
+            if not os.path.exists(path):
+                continue
+            df = pd.read_parquet(path)
+            first = request_start(period, start, end or df.index[-1])
+            if df.index.tz is not None and first.tz is None:
+                first = first.tz_localize(df.index.tz)
+            frames[ticker] = df[df.index >= first]
+        return combine(frames)
+
+
+class RecordingSource:
+    # Passes downloads through to another source and keeps every bar it saw as a fixture
+    def __init__(self, inner, root):
+        self.inner = inner
+        self.fixtures = FixtureSource(root)
+        self.name = f"recording({inner.name})"
+
+    def download(self, tickers, interval="1d", **kwargs):
+        raw = self.inner.download(tickers, interval=interval, **kwargs)
+        if raw is None or raw.empty or not isinstance(raw.columns, pd.MultiIndex):
+            return raw
+        for ticker in raw.columns.get_level_values(0).unique():
+            new = raw[ticker].dropna(how='all')
+            path = self.fixtures.path(ticker, interval)
+            if os.path.exists(path):
+                new = pd.concat([pd.read_parquet(path), new])
+                new = new[~new.index.duplicated(keep='last')].sort_index()
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            new.to_parquet(path)
+        return raw
+
+
+# --- SELECTION ---
+_current = {"source": None}
+
+
+def make_source(spec):
+    if spec == "yfinance":
+        return YFinanceSource()
+    if spec == "synthetic":
+        return SyntheticSource()
+    if spec.startswith("fixture:"):
+        return FixtureSource(spec.split(":", 1)[1])
+    if spec.startswith("record:"):
+        return RecordingSource(YFinanceSource(), spec.split(":", 1)[1])
+    raise ValueError(f"Unknown data source '{spec}' (use yfinance, synthetic, fixture:<dir> or record:<dir>)")
+
+
+def get_source():
+    if _current["source"] is None:
+        _current["source"] = make_source(DATA_SOURCE)
+    return _current["source"]
+
+
+def set_source(source):
+    # Accepts a source object or a spec string; returns the previous source
+    previous = _current["source"]
+    _current["source"] = make_source(source) if isinstance(source, str) else source
+    return previous
@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+
+# --- SETTINGS ---
+CANDLE_PX = 4              # Minimum on-screen width of one candle / volume bar, in pixels
+LINE_POINTS_PER_PX = 1     # Line points kept per horizontal pixel (more is invisible anyway)
+
+# Downsampling for charts: the browser only needs about one point per pixel.
+# Candles and volume are re-aggregated into coarser OHLC bars (first open, max high, min low,
+# last close, summed volume), so every wick and gap stays visible. Indicator lines use
+# Largest-Triangle-Three-Buckets (LTTB), which keeps the points that shape the line
+# (peaks, troughs) instead of every n-th point. Indicators are always computed on the
+# full-resolution bars first; only what is drawn is reduced.
+
+
+# --- RESOLUTION ---
+def target_sizes(width_px):
+    return max(int(width_px // CANDLE_PX), 10), max(int(width_px * LINE_POINTS_PER_PX), 3)
+
+
+# --- OHLC RE-AGGREGATION ---
+def aggregate_ohlc(df, max_bars):
+    # Buckets of k consecutive bars, aligned so the newest bar closes the last bucket
+    n = len(df)
+    if n <= max_bars:
+        return df[['Open', 'High', 'Low', 'Close', 'Volume']], 1
+    k = int(np.ceil(n / max_bars))
+    starts = np.arange(n - k * int(np.ceil(n / k)), n, k).clip(min=0)
+    ends = np.append(starts[1:], n) - 1
+    out = pd.DataFrame({
+        'Open': df['Open'].to_numpy()[starts],
+        'High': np.maximum.reduceat(df['High'].to_numpy(), starts),
+        'Low': np.minimum.reduceat(df['Low'].to_numpy(), starts),
+        'Close': df['Close'].to_numpy()[ends],
+        'Volume': np.add.reduceat(df['Volume'].to_numpy(dtype=float), starts),
+    }, index=df.index[starts])
+    return out, k
+
+
+# --- LTTB FOR LINES ---
+def lttb_indices(x, y, n_out):
+    # Positions of the n_out points that keep the visual shape of (x, y); first and last always kept
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    every = (n - 2) / (n_out - 2)
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = int(i * every) + 1, int((i + 1) * every) + 1
+        next_lo, next_hi = hi, min(int((i + 2) * every) + 1, n)
+        avg_x, avg_y = x[next_lo:next_hi].mean(), y[next_lo:next_hi].mean()
+        # Point of this bucket forming the largest triangle with the previous pick and the next bucket's mean
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def lttb_series(series, n_out):
+    series = series.dropna()
+    if len(series) <= n_out:
+        return series
+    x = series.index.asi8.astype(float) if isinstance(series.index, pd.DatetimeIndex) \
+        else np.arange(len(series), dtype=float)
+    return series.iloc[lttb_indices(x, series.to_numpy(dtype=float), n_out)]
+
+
+# --- FUNCTION: EVERYTHING A CHART NEEDS ---
+def downsample_frame(df, width_px, line_columns=()):
+    max_bars, max_points = target_sizes(width_px)
+    candles, factor = aggregate_ohlc(df, max_bars)
+    lines = {col: lttb_series(df[col], max_points) for col in line_columns}
+    return {
+        "candles": candles,
+        "lines": lines,
+        "bars_per_candle": factor,
+        "raw_points": len(df) * (5 + len(line_columns)),
+        "drawn_points": len(candles) * 5 + sum(len(s) for s in lines.values()),
+    }
@@ -1,13 +1,22 @@
-import yfinance as yf
 import pandas as pd
-import pandas_ta as ta
 import numpy as np
-from scipy.signal import find_peaks
-import json
 import os
-import smtplib
-import ssl
-from email.message import EmailMessage
+import argparse
+import threading
+from indicators import scan_table, add_indicators
+from indicator_state import StreamingIndicators
+from correlation import correlation_matrices, CORR_WINDOWS
+from spectral import spectral_analysis
+from output_store import publish, load_table
+from alerts import run_alerts
+from scheduler import Job, run_scheduler
+from metrics import (run_metrics, stage, error, gauge_value, cache_hit, load_runs, health_table, health_tolerances,
+                     HEALTH_TABLE)
+from scan_schema import scan_frame, as_scan_table, empty_scan
+from scan_tiers import ScanSchedule, realized_volatility, VOL_WINDOW, TIERS
+from analysis_cache import AnalysisCache, COIN_LIST, technical_state, make_client, ANALYSIS_MODEL
+from timeframes import (DEFAULT_TIMEFRAME, TIMEFRAMES, update_timeframe_store, load_timeframe_bars,
+                        load_timeframe_closes, bar_minutes, bars_per_day, date_format, output_name)
 
 # --- SETTINGS ---
 SCAN_LIST = [
@@ -16,182 +25,192 @@ SCAN_LIST = [
     "DOT-USD", "AVAX-USD", "SHIB-USD", "MATIC-USD"
 ]
 
-OUTPUT_SCAN_FILE = "market_scan.json"
-OUTPUT_ADVANCED_FILE = "advanced_analysis.json"
+# Results go to results/ (Arrow/NumPy files + manifest.json), see output_store.py
+OUTPUT_SCAN_TABLE = "market_scan"
+OUTPUT_ADVANCED_RESULTS = "advanced_analysis"
 
-# --- FUNCTION 1: MARKET SCANNER ---
-def run_market_scanner():
-    print("Starting market scan...")
-    df_list = []
-    
-    for ticker in SCAN_LIST:
-        try:
-            # --- FIX #1: Added group_by='column' to flatten the columns ---
-            data = yf.download(ticker, period="1y", progress=False, group_by='column')
-            if data.empty: continue
-                
-            data.ta.rsi(length=14, append=True)
-            data.ta.sma(length=50, append=True)
-            data.ta.sma(length=200, append=True)
-            
-            data = data.dropna()
-            if data.empty: continue
-
-            last = data.iloc[-1]
-            daily_change = (last['Close'] / data.iloc[-2]['Close'] - 1) * 100
-            
-            if last['RSI_14'] > 70: rsi_signal = "Overbought"
-            elif last['RSI_14'] < 30: rsi_signal = "Oversold"
-            else: rsi_signal = "Neutral"
-                
-            if last['Close'] > last['SMA_50'] and last['Close'] > last['SMA_200']: trend = "Strong Bullish"
-            elif last['Close'] > last['SMA_200']: trend = "Bullish"
-            else: trend = "Bearish"
-            
-            df_list.append({
-                "מטבע": ticker,
-                "מחיר אחרון": last['Close'],
-                "שינוי יומי (%)": daily_change,
-                "RSI (14)": last['RSI_14'],
-                "סיגנל RSI": rsi_signal,
-                "מגמה": trend,
-                "מרחק מ-SMA200 (%)": (last['Close'] / last['SMA_200'] - 1) * 100
-            })
-            print(f"... Successfully scanned {ticker}")
-        except Exception as e:
-            print(f"!!! Error scanning {ticker}: {e}")
-            
-    print("Market scan finished.")
-    return pd.DataFrame(df_list)
+# Changes smaller than these are not "material": the scan table is not rewritten (or committed)
+SCAN_TOLERANCES = {
+    "close": ("rel", 0.001),
+    "daily_change": ("abs", 0.1),
+    "rsi": ("abs", 0.5),
+    "dist_sma_slow": ("abs", 0.1),
+    "sma_fast": ("rel", 0.001),
+    "sma_slow": ("rel", 0.001),
+    "bb_lower": ("rel", 0.001),
+    "bb_upper": ("rel", 0.001)
+}
 
-# --- FUNCTION 2: SEND EMAIL ALERT ---
-def send_email_alert(subject, body):
-    email_sender = os.environ.get('EMAIL_SENDER')
-    email_password = os.environ.get('EMAIL_PASSWORD')
-    email_receiver = os.environ.get('EMAIL_RECEIVER')
+# Data each analysis stage needs: planned up front so everything is fetched once.
+# Lookbacks are in bars of the engine's timeframe (1y / 2y on daily bars).
+STAGE_REQUIREMENTS = {
+    "scanner": {"tickers": SCAN_LIST, "bars": 366},
+    "correlation": {"tickers": SCAN_LIST, "bars": 366},
+    "fft": {"tickers": SCAN_LIST, "bars": 731},
+    "analysis": {"tickers": list(dict.fromkeys(list(COIN_LIST.values()) + SCAN_LIST)), "bars": 731},
+}
 
-    if not all([email_sender, email_password, email_receiver]):
-        print("!!! Alert Error: Environment variables (EMAIL_SENDER, EMAIL_PASSWORD, EMAIL_RECEIVER) not set.")
-        print("!!! Make sure you have set up your GitHub Secrets.")
-        return
+# --- DATA PLANNING: ONE SHARED SNAPSHOT FOR ALL STAGES ---
+def plan_data_requirements(stages=STAGE_REQUIREMENTS, timeframe=DEFAULT_TIMEFRAME):
+    # Union of all tickers (in first-seen order) and the longest lookback of any stage;
+    # at least a day and a bar, for the scanner's 24h change on fine timeframes
+    tickers = list(dict.fromkeys(t for req in stages.values() for t in req["tickers"]))
+    bars = max(max(req["bars"] for req in stages.values()), bars_per_day(timeframe) + 1)
+    return {"tickers": tickers, "bars": bars}
 
-    # Build the message object
-    msg = EmailMessage()
-    msg.set_content(body)
-    msg['Subject'] = subject
-    msg['From'] = email_sender
-    msg['To'] = email_receiver
+def merge_frame(frame, bars, lookback):
+    # New bars (from the last held bar on, which may have been still forming) onto a held frame
+    if frame is None or frame.empty:
+        return bars.iloc[-lookback:]
+    new = bars[bars.index >= frame.index[-1]]
+    if new.empty:
+        return frame
+    return pd.concat([frame[frame.index < new.index[0]], new]).iloc[-lookback:]
 
-    print(f"Preparing to send email to {email_receiver}...")
+def load_snapshot(plan, state=None, timeframe=DEFAULT_TIMEFRAME, fetch=None, previous=None):
+    # fetch: tickers to download new bars for (adaptive scan); the others keep their bars.
+    # previous: the last snapshot; its frames stay in memory and only get the new bars merged in
+    fetch = plan["tickers"] if fetch is None else fetch
+    print(f"Loading snapshot: {len(plan['tickers'])} tickers ({len(fetch)} refreshed), lookback {plan['bars']} bars of {timeframe}")
+    # A new dict each time: jobs still reading the previous snapshot never see it change
+    frames = dict(previous["frames"]) if previous and previous["timeframe"] == timeframe else {}
 
-    try:
-        # Create a secure SSL context
-        context = ssl.create_default_context()
-        with smtplib.SMTP_SSL("smtp.gmail.com", 465, context=context) as smtp:
-            smtp.login(email_sender, email_password)
-            smtp.send_message(msg)
-            print("--- Email alert sent successfully! ---")
-    except Exception as e:
-        print(f"!!! Critical error sending email: {e}")
+    def on_update(ticker, bars):
+        # Streaming: fold each ticker's new closed bars into the indicator state as its download lands
+        if state is not None:
+            state.catch_up(bars[['Close']].rename(columns={'Close': ticker}))
+        frames[ticker] = merge_frame(frames.get(ticker), bars, plan["bars"])
 
-# --- FUNCTION 3: CHECK FOR ALERTS ---
-def check_for_alerts(df):
-    print("\nChecking for alerts...")
-    alerts = []
-    
-    try:
-        # Specific alert for Bitcoin
-        btc_data = df[df['מטבע'] == 'BTC-USD'].iloc[0]
-        if btc_data['RSI_14'] < 30:
-            alerts.append(f"🔴 BTC Alert: Oversold! RSI: {btc_data['RSI_14']:.2f}")
-        if btc_data['RSI_14'] > 70:
-            alerts.append(f"🟠 BTC Alert: Overbought! RSI: {btc_data['RSI_14']:.2f}")
-    except Exception as e:
-        print(f"Error checking BTC alert: {e}")
+    # Only the stored source interval is downloaded; coarser timeframes are resampled from it
+    if fetch:
+        update_timeframe_store(fetch, timeframe, on_update=on_update)
+    for ticker in plan["tickers"]:
+        if ticker in frames:
+            continue
+        # Not held yet (first run, or nothing new downloaded): read it from the store once
+        df = load_timeframe_bars(ticker, timeframe, bars=plan["bars"])
+        if not df.empty:
+            frames[ticker] = df
+    # Pin every stage to the same as-of time, even if a ticker got a newer bar mid-run
+    as_of = max((df.index[-1] for df in frames.values()), default=None)
+    return {"as_of": as_of, "aligned_as_of": aligned_as_of(frames, as_of, timeframe),
+            "bars": plan["bars"], "timeframe": timeframe, "frames": frames}
+
+def aligned_as_of(frames, as_of, timeframe):
+    # Last bar every coin has, for the cross-sectional stages (correlation, FFT). An adaptive scan
+    # leaves skipped coins up to one tier interval behind; coins lagging further (delisted, failed
+    # for days) stay out of it as before and just end in NaN.
+    if as_of is None:
+        return None
+    max_lag = pd.Timedelta(minutes=max(tier["every_minutes"] for tier in TIERS) + bar_minutes(timeframe))
+    return min(last for last in (df.index[-1] for df in frames.values()) if last >= as_of - max_lag)
 
-    # General alert for any oversold coin
-    oversold = df[df['סיגנל RSI'] == "Oversold"]
-    for _, row in oversold.iterrows():
-        if row['מטבע'] != 'BTC-USD': # We already handled Bitcoin
-            alerts.append(f"🟢 Opportunity Alert: {row['מטבע']} is Oversold. RSI: {row['RSI_14']:.2f}")
+def snapshot_bars(snapshot, ticker, bars, aligned=False):
+    df = snapshot["frames"].get(ticker)
+    if df is None:
+        return pd.DataFrame()
+    as_of = snapshot["aligned_as_of"] if aligned else snapshot["as_of"]
+    return df[df.index <= as_of].iloc[-bars:]
+
+def snapshot_closes(snapshot, tickers, bars, aligned=False):
+    closes = {t: snapshot_bars(snapshot, t, bars, aligned)['Close'] for t in tickers if t in snapshot["frames"]}
+    return pd.DataFrame(closes).iloc[-bars:]
+
+# --- FUNCTION 1: MARKET SCANNER ---
+def run_market_scanner(snapshot, state=None, tickers=None):
+    print("Starting market scan...")
+    req = STAGE_REQUIREMENTS["scanner"]
+    tickers = req["tickers"] if tickers is None else tickers
 
-    if not alerts:
-        print("No new alerts.")
+    change_bars = bars_per_day(snapshot["timeframe"])   # daily_change is a 24h change on every timeframe
+    closes = snapshot_closes(snapshot, tickers, max(req["bars"], change_bars + 1) if state is None else snapshot["bars"])
+    if closes.empty:
+        table = empty_scan()   # Every download failed (or no network on a first run)
+    elif state is None:
+        # Wide close matrix (dates x tickers) -> RSI/SMA/Bollinger and signals for all coins in one pass
+        table = scan_table(closes, change_bars)
     else:
-        # If there are alerts, build an email
-        print(f"Found {len(alerts)} new alerts. Sending email...")
-        
-        subject = f"🤖 Crypto Alert: {len(alerts)} New Events"
-        body = "The monitoring system has detected the following alerts:\n\n"
-        body += "\n".join(alerts)
-        body += "\n\n-- End of message --"
-        
-        # Print to log and also send email
-        print(body)
-        send_email_alert(subject, body)
+        # Streaming state: commit only the bars closed since the last run, then preview the forming bar
+        live = state.catch_up(closes)
+        table = state.latest(live)
+
+    for ticker in tickers:
+        if ticker not in table.index:
+            print(f"!!! Error scanning {ticker}: not enough data")
+            error()
+    print(f"... Successfully scanned {len(table)} tickers")
+
+    print("Market scan finished.")
+    # Typed table (ticker index, float32, categorical labels); see scan_schema.py
+    return scan_frame(table)
+
+# --- FUNCTION 2+3: ALERTS ---
+def check_for_alerts(df, timeframe=DEFAULT_TIMEFRAME):
+    # Rule-driven and stateful: only transitions fire, delivered as one digest per run (see alerts.py)
+    return run_alerts(df, timeframe=timeframe)
 
 # --- FUNCTION 4: ADVANCED ANALYSIS (WITH FFT GRAPH) ---
-def run_advanced_analysis():
+def run_advanced_analysis(snapshot):
     print("\nStarting advanced analysis...")
-    results = {}
+    timeframe = snapshot["timeframe"]
+    # Windows, lookbacks and cycle periods are in bars; bar_minutes converts them to time on the dashboard
+    results = {"timeframe": timeframe, "bar_minutes": bar_minutes(timeframe)}
+    corr_req = STAGE_REQUIREMENTS["correlation"]
+    fft_req = STAGE_REQUIREMENTS["fft"]
 
     try:
         # 1. Correlation Analysis
-        print("... Calculating correlation...")
-        # --- FIX #2: Added group_by='column' to flatten the columns ---
-        df_corr = yf.download(["BTC-USD", "ETH-USD", "SOL-USD"], period="3mo", progress=False, group_by='column')['Close']
-        returns = df_corr.pct_change().dropna()
-        corr_btc_eth = returns['BTC-USD'].rolling(30).corr(returns['ETH-USD']).iloc[-1]
-        corr_btc_sol = returns['BTC-USD'].rolling(30).corr(returns['SOL-USD']).iloc[-1]
-        results['correlation'] = {
-            "btc_eth_30d": corr_btc_eth,
-            "btc_sol_30d": corr_btc_sol
-        }
-
-        # 2. Cyclical Analysis (FFT) on Bitcoin
-        print("... Calculating FFT...")
-         # --- FIX #3: Added group_by='column' to flatten the columns ---
-        df_btc = yf.download("BTC-USD", period="2y", progress=False, group_by='column')['Close']
-        data = df_btc.values
-        
-        N = len(data)
-        if N < 100: # Ensure there is enough data
-            raise ValueError("Not enough data for FFT analysis (minimum 100 days)")
-
-        # Remove DC component
-        yf = np.fft.fft(data - np.mean(data))
-        # Calculate Amplitude
-        yf = 2.0/N * np.abs(yf[:N//2])
-        
-        # xf = frequency (cycles per day), 1 = 1 day
-        xf = np.fft.fftfreq(N, 1)[:N//2] 
-        
-        # Convert from frequencies to periods (days)
-        # Ignore frequency 0 (remaining DC component)
-        periods = 1.0 / xf[1:] 
-        power = yf[1:]
-
-        # Focus on relevant periods (e.g., 1 week to 1 year)
-        min_period_days = 7
-        max_period_days = 365
-        
-        # Create a boolean mask for filtering
-        mask = (periods >= min_period_days) & (periods <= max_period_days)
-        
-        filtered_periods = periods[mask]
-        filtered_power = power[mask]
-        
-        # Find peaks (like before, but on the filtered data)
-        peaks, _ = find_peaks(filtered_power, height=np.mean(filtered_power) + np.std(filtered_power))
-        dominant_periods = filtered_periods[peaks]
-
-        results['fft_analysis'] = {
-            # Raw data for the graph
-            "fft_periods": filtered_periods.tolist(), # X-axis
-            "fft_power": filtered_power.tolist(),     # Y-axis
-            # Summarized result (as before)
-            "dominant_periods_days": sorted(dominant_periods, reverse=True)
-        }
+        with stage("correlation"):
+            print("... Calculating correlation...")
+            # Cut back to the last bar every coin has, so a coin the adaptive scan skipped is not NaN
+            df_corr = snapshot_closes(snapshot, corr_req["tickers"], corr_req["bars"], aligned=True)
+            returns = df_corr.pct_change(fill_method=None).iloc[1:]
+            # Full N x N rolling matrices for every window, stored as float32 upper triangles
+            matrices, upper_triangles, mean_series = correlation_matrices(returns, CORR_WINDOWS)
+            tickers = list(returns.columns)
+            matrix_30d = matrices[30]
+            results['correlation'] = {
+                "btc_eth_30d": matrix_30d[tickers.index("BTC-USD"), tickers.index("ETH-USD")],
+                "btc_sol_30d": matrix_30d[tickers.index("BTC-USD"), tickers.index("SOL-USD")],
+                "tickers": tickers,
+                "windows": {str(w): upper_triangles[w] for w in CORR_WINDOWS},
+                # Mean pairwise correlation over time: a market-wide "everything moves together" gauge
+                "mean_history": {
+                    str(w): {
+                        "dates": returns.index[np.isfinite(series)].strftime(date_format(timeframe)).tolist(),
+                        "values": series[np.isfinite(series)]
+                    } for w, series in mean_series.items()
+                }
+            }
+
+        # 2. Cyclical Analysis (FFT, Welch, spectrogram) for every coin in one batched pass
+        with stage("fft"):
+            print("... Calculating FFT...")
+            closes = snapshot_closes(snapshot, fft_req["tickers"], fft_req["bars"], aligned=True)
+            spectra = spectral_analysis(closes, date_format(timeframe))
+            tickers = spectra["tickers"]
+
+            # Bitcoin periodogram in the original format
+            btc = tickers.index("BTC-USD")
+            results['fft_analysis'] = {
+                # Raw data for the graph
+                "fft_periods": spectra["periods"], # X-axis
+                "fft_power": spectra["amplitude"][btc],     # Y-axis
+                # Summarized result (as before)
+                "dominant_periods_days": spectra["dominant"][btc]
+            }
+            results['spectral'] = {
+                "tickers": tickers,
+                "bars": spectra["bars"],
+                "periods": spectra["periods"],
+                "amplitude": spectra["amplitude"],
+                "dominant_periods": spectra["dominant"],
+                "welch_periods": spectra["welch_periods"],
+                "welch_density": spectra["welch_density"],
+                "spectrogram_periods": spectra["spectrogram_periods"],
+                "spectrogram_dates": spectra["spectrogram_dates"],
+                "spectrogram": spectra["spectrogram"]
+            }
         print("Advanced analysis finished.")
         
     except Exception as e:
@@ -200,21 +219,213 @@ def run_advanced_analysis():
         
     return results
 
-# --- MAIN EXECUTION FUNCTION ---
-if __name__ == "__main__":
-    
-    scan_df = run_market_scanner()
-    if not scan_df.empty:
-        scan_df.to_json(OUTPUT_SCAN_FILE, orient="records", indent=4, force_ascii=False)
-        print(f"\nScan results saved to {OUTPUT_SCAN_FILE}")
-        check_for_alerts(scan_df)
+# --- FUNCTION 5: PRE-GENERATED AI ANALYSES ---
+def run_analysis_batch(snapshot, client, cache=None):
+    # One model call per coin whose quantized technical state has no stored analysis yet;
+    # the Deep Dive page then serves it from results/analyses/ without waiting on the model
+    print("\nPre-generating AI analyses...")
+    cache = cache or AnalysisCache()
+    timeframe = snapshot["timeframe"]
+    generated = 0
+    analysis = STAGE_REQUIREMENTS["analysis"]
+    for ticker in analysis["tickers"]:
+        # Two years of bars from the snapshot: the indicators' last row matches the Deep Dive's on the full history
+        df = snapshot_bars(snapshot, ticker, analysis["bars"])
+        df = add_indicators(df).dropna() if not df.empty else df
+        if df.empty:
+            print(f"!!! No data for {ticker}, skipping its analysis")
+            error()
+            continue
+        state = technical_state(df.iloc[-1], ticker, timeframe)
+        entry, hit = cache.analyze(state, client)
+        cache_hit("analysis", hit)
+        if not hit:
+            if entry["text"].startswith("Error generating analysis"):
+                print(f"!!! {ticker}: {entry['text']}")
+                error()
+            else:
+                generated += 1
+    print(f"AI analyses ready ({generated} generated, the rest unchanged).")
+
+# --- ENGINE JOBS ---
+# Warm state shared by the jobs; in daemon mode it stays in memory between runs
+ENGINE = {"timeframe": DEFAULT_TIMEFRAME, "snapshot": None, "indicator_state": None, "scan_df": None,
+          "prometheus_file": None, "analysis_client": None, "scan_schedule": None}
+DATA_LOCK = threading.Lock()      # Snapshot refresh + streaming indicator state
+SNAPSHOT_READY = threading.Event()   # Set once the first snapshot is loaded
+SNAPSHOT_WAIT_SECONDS = 600       # Longest a dependent job waits for the scanner's first snapshot
+PUBLISH_LOCK = threading.Lock()   # The manifest is read-modify-write
+
+def refresh_snapshot(fetch=None):
+    with DATA_LOCK:
+        if ENGINE["indicator_state"] is None:
+            ENGINE["indicator_state"] = StreamingIndicators.load(ENGINE["timeframe"])
+        # Plan every stage's data needs, then fetch once (only bars newer than the store holds)
+        with stage("fetch"):
+            ENGINE["snapshot"] = load_snapshot(plan_data_requirements(timeframe=ENGINE["timeframe"]), ENGINE["indicator_state"], ENGINE["timeframe"],
+                                               fetch, previous=ENGINE["snapshot"])
+        SNAPSHOT_READY.set()
+    gauge_value("tickers", len(ENGINE["snapshot"]["frames"]))
+    return ENGINE["snapshot"]
+
+def shared_snapshot():
+    # The advanced and analysis jobs read the scanner's snapshot instead of fetching their own;
+    # at daemon start-up, when all jobs run at once, they wait for the scanner's first one
+    if ENGINE["snapshot"] is None and not SNAPSHOT_READY.wait(SNAPSHOT_WAIT_SECONDS):
+        print("!!! No scanner snapshot yet, loading one")
+        return refresh_snapshot()
+    return ENGINE["snapshot"]
+
+def previous_scan():
+    # Last scan table: in memory (daemon) or the published one (cron runs)
+    if ENGINE["scan_df"] is not None:
+        return ENGINE["scan_df"]
+    try:
+        return as_scan_table(load_table(output_name(OUTPUT_SCAN_TABLE, ENGINE["timeframe"])))
+    except FileNotFoundError:
+        return None
+
+def plan_adaptive_scan(schedule):
+    # Tiers come from the stored bars and the last scan, before anything is downloaded
+    tickers = STAGE_REQUIREMENTS["scanner"]["tickers"]
+    closes = load_timeframe_closes(tickers, ENGINE["timeframe"], VOL_WINDOW + 1)
+    return schedule.plan(tickers, previous_scan(), realized_volatility(closes))
+
+def merge_scan(previous, scan_df, tickers):
+    # Rows of the refreshed tickers replace their previous ones; skipped tickers keep theirs
+    if previous is None:
+        return scan_df
+    merged = pd.concat([previous[~previous.index.isin(scan_df.index)], scan_df])
+    return scan_frame(merged.loc[[t for t in tickers if t in merged.index]])
+
+def scan_job():
+    schedule = ENGINE["scan_schedule"]
+    if schedule is None:
+        snapshot = refresh_snapshot()
+        with DATA_LOCK, stage("indicators"):
+            scan_df = run_market_scanner(snapshot, ENGINE["indicator_state"])
+            ENGINE["indicator_state"].save(ENGINE["timeframe"])
     else:
+        # Adaptive: only the tickers whose tier is due are downloaded and recomputed (see scan_tiers.py)
+        with stage("schedule"):
+            plan = plan_adaptive_scan(schedule)
+            previous = previous_scan()
+        snapshot = refresh_snapshot(fetch=plan["refresh"])
+        if plan["refresh"]:
+            with DATA_LOCK, stage("indicators"):
+                scan_df = run_market_scanner(snapshot, ENGINE["indicator_state"], plan["refresh"])
+                ENGINE["indicator_state"].save(ENGINE["timeframe"])
+            scan_df = merge_scan(previous, scan_df, STAGE_REQUIREMENTS["scanner"]["tickers"])
+        else:
+            scan_df = previous if previous is not None else pd.DataFrame()   # Nothing due: the last scan stands
+        universe = len(STAGE_REQUIREMENTS["scanner"]["tickers"])
+        schedule.record(plan, universe)
+        schedule.save()
+        savings = schedule.report(plan, universe)
+        gauge_value("tickers_refreshed", savings["refreshed"])
+        gauge_value("tickers_skipped", savings["skipped"])
+    ENGINE["scan_df"] = scan_df
+    if scan_df.empty:
         print("No scan data was generated.")
+        return
+    # Compact columnar output, written atomically (manifest last) and only when something material changed.
+    # Rows are keyed by the ticker index.
+    name = output_name(OUTPUT_SCAN_TABLE, ENGINE["timeframe"])
+    with PUBLISH_LOCK, stage("serialize"):
+        publish(tables={name: scan_df}, tolerances={name: SCAN_TOLERANCES})
 
-    advanced_data = run_advanced_analysis()
-    
-    with open(OUTPUT_ADVANCED_FILE, 'w', encoding='utf-8') as f:
-        json.dump(advanced_data, f, indent=4, ensure_ascii=False)
-    print(f"Advanced analysis results saved to {OUTPUT_ADVANCED_FILE}")
+def advanced_job():
+    snapshot = shared_snapshot()
+    gauge_value("tickers", len(snapshot["frames"]))
+    advanced_data = run_advanced_analysis(snapshot)
+    with PUBLISH_LOCK, stage("serialize"):
+        publish(results={output_name(OUTPUT_ADVANCED_RESULTS, ENGINE["timeframe"]): advanced_data})
+
+def alert_job():
+    if ENGINE["scan_df"] is None or ENGINE["scan_df"].empty:
+        print("No scan data yet, skipping alerts.")
+        return
+    with stage("alert"):
+        check_for_alerts(ENGINE["scan_df"], ENGINE["timeframe"])
+
+def analysis_job():
+    if ENGINE["analysis_client"] is None:
+        print("No analysis model configured (set GEMINI_API_KEY or ANALYSIS_MODEL=stub), skipping AI analyses.")
+        return
+    snapshot = shared_snapshot()
+    with stage("analysis"):
+        run_analysis_batch(snapshot, ENGINE["analysis_client"])
+
+def publish_health():
+    # Daily summary of the local run files for the Engine Health page (the run files are not committed)
+    try:
+        with PUBLISH_LOCK:
+            try:
+                previous = load_table(HEALTH_TABLE)
+            except FileNotFoundError:
+                previous = None
+            table = health_table(load_runs(), previous)
+            if table is not None and not table.empty:
+                publish(tables={HEALTH_TABLE: table}, tolerances={HEALTH_TABLE: health_tolerances(table)})
+    except Exception as e:
+        print(f"!!! Could not publish the engine health table: {e}")
+
+def measured(kind, job):
+    # Every run writes metrics/run_<time>_<kind>.json (stage timings, fetch latency, caches, errors, RSS)
+    def run():
+        try:
+            with run_metrics(kind, ENGINE["timeframe"], ENGINE["prometheus_file"]):
+                job()
+        finally:
+            publish_health()
+    return run
+
+def run_once(analyses=False):
+    scan_job()
+    advanced_job()
+    alert_job()
+    if analyses:
+        analysis_job()
+
+def run_daemon(scan_minutes, advanced_minutes, alert_minutes, analysis_minutes=None):
+    # Resident mode: imports, bar data and indicator state stay warm between runs
+    jobs = [
+        Job("scanner", measured("scanner", scan_job), scan_minutes * 60),
+        Job("advanced", measured("advanced", advanced_job), advanced_minutes * 60),
+        Job("alerts", measured("alerts", alert_job), alert_minutes * 60),
+    ]
+    if analysis_minutes:
+        jobs.append(Job("analyses", measured("analyses", analysis_job), analysis_minutes * 60))
+    run_scheduler(jobs)
+
+# --- MAIN EXECUTION FUNCTION ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Crypto analysis engine")
+    parser.add_argument("--daemon", action="store_true", help="Stay resident and run jobs on a schedule")
+    parser.add_argument("--scan-interval", type=float, default=30, help="Minutes between scanner runs (daemon)")
+    parser.add_argument("--advanced-interval", type=float, default=60, help="Minutes between advanced analysis runs (daemon)")
+    parser.add_argument("--alert-interval", type=float, default=30, help="Minutes between alert checks (daemon)")
+    parser.add_argument("--timeframe", choices=list(TIMEFRAMES), default=DEFAULT_TIMEFRAME,
+                        help="Bar size for every stage (outputs of non-daily timeframes get a suffix)")
+    parser.add_argument("--analyses", action="store_true",
+                        help="Pre-generate the AI analyses of every coin whose technical state changed")
+    parser.add_argument("--analysis-interval", type=float, default=60, help="Minutes between AI analysis runs (daemon)")
+    parser.add_argument("--adaptive", action="store_true",
+                        help="Refresh each coin on its own tier (volatility, distance to signal thresholds) within ENGINE_SCAN_BUDGET")
+    parser.add_argument("--prometheus", metavar="PATH", default=None,
+                        help="Also write run metrics in Prometheus text format (node_exporter textfile collector)")
+    args = parser.parse_args()
+    ENGINE["timeframe"] = args.timeframe
+    ENGINE["prometheus_file"] = args.prometheus
+    if args.adaptive:
+        ENGINE["scan_schedule"] = ScanSchedule(args.timeframe)
+    if args.analyses and (ANALYSIS_MODEL != "gemini" or os.environ.get("GEMINI_API_KEY")):
+        ENGINE["analysis_client"] = make_client(ANALYSIS_MODEL, os.environ.get("GEMINI_API_KEY"))
+
+    if args.daemon:
+        run_daemon(args.scan_interval, args.advanced_interval, args.alert_interval,
+                   args.analysis_interval if args.analyses else None)
+    else:
+        measured("once", lambda: run_once(args.analyses))()
     
     print("\n--- Engine run finished ---")
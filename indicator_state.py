@@ -0,0 +1,208 @@
+import os
+import numpy as np
+import pandas as pd
+from indicators import (RSI_LENGTH, SMA_FAST, SMA_SLOW, BB_LENGTH, BB_STD,
+                        classify_rsi, classify_trend, classify_bbands)
+from timeframes import bars_per_day
+
+# --- SETTINGS ---
+STATE_FILE = os.path.join("bar_store", "indicator_state_{interval}.npz")
+BUFFER_SIZE = max(SMA_FAST, SMA_SLOW, BB_LENGTH)   # Ring buffer must cover the longest window (and 24h of bars)
+RESYNC_EVERY = 500   # Recompute running sums from the ring buffer every N bars to stop float drift
+
+NO_TIMESTAMP = np.iinfo(np.int64).min
+
+# Persisted per-ticker state, all arrays indexed by ticker position:
+#   RSI:       Wilder-smoothed gain/loss sums (the ewm weight cancels out in the RSI ratio)
+#   SMA / BB:  running window sums plus a ring buffer of the last BUFFER_SIZE closes
+#              (more on fine timeframes, where 24 hours of bars are needed for daily_change)
+# Pushing one bar updates every ticker in O(1); the math matches indicators.py (and pandas_ta).
+ARRAY_FIELDS = {
+    "last_ts": np.int64, "count": np.int64, "pos": np.int64, "since_resync": np.int64,
+    "prev_close": float, "gain_sum": float, "loss_sum": float, "n_changes": np.int64,
+    "sum_fast": float, "sum_slow": float, "bb_offset": float, "bb_sum": float, "bb_sumsq": float,
+}
+
+
+class StreamingIndicators:
+    def __init__(self, tickers=(), change_bars=1):
+        self.change_bars = change_bars   # Bars in 24 hours (timeframes.bars_per_day)
+        self.buffer_size = max(BUFFER_SIZE, change_bars)
+        self.tickers = []
+        self.index = {}
+        for name, dtype in ARRAY_FIELDS.items():
+            setattr(self, name, np.zeros(0, dtype=dtype))
+        self.buffer = np.zeros((0, self.buffer_size))
+        self.ensure_tickers(tickers)
+
+    # --- TICKER MANAGEMENT ---
+    def ensure_tickers(self, tickers):
+        new = [t for t in tickers if t not in self.index]
+        if not new:
+            return
+        for name, dtype in ARRAY_FIELDS.items():
+            fill = NO_TIMESTAMP if name == "last_ts" else (np.nan if name in ("prev_close", "bb_offset") else 0)
+            setattr(self, name, np.concatenate([getattr(self, name), np.full(len(new), fill, dtype=dtype)]))
+        self.buffer = np.concatenate([self.buffer, np.full((len(new), self.buffer_size), np.nan)])
+        for t in new:
+            self.index[t] = len(self.tickers)
+            self.tickers.append(t)
+
+    # --- CORE UPDATE ---
+    def _ago(self, rows, bars_ago):
+        # Close that was pushed `bars_ago` bars before the newest one (0 = newest)
+        return self.buffer[rows, (self.pos[rows] - 1 - bars_ago) % self.buffer_size]
+
+    def _next_sums(self, rows, close):
+        count = self.count[rows]
+        has_prev = count > 0
+        change = np.where(has_prev, close - self.prev_close[rows], 0.0)
+        decay = 1.0 - 1.0 / RSI_LENGTH
+        gain_sum = np.where(has_prev, decay * self.gain_sum[rows] + np.clip(change, 0, None), 0.0)
+        loss_sum = np.where(has_prev, decay * self.loss_sum[rows] + np.clip(-change, 0, None), 0.0)
+        n_changes = self.n_changes[rows] + has_prev
+
+        # The bar leaving each window (only once the window is full)
+        drop_fast = np.where(count >= SMA_FAST, self._ago(rows, SMA_FAST - 1), 0.0)
+        drop_slow = np.where(count >= SMA_SLOW, self._ago(rows, SMA_SLOW - 1), 0.0)
+        bb_offset = np.where(np.isnan(self.bb_offset[rows]), close, self.bb_offset[rows])
+        drop_bb = np.where(count >= BB_LENGTH, self._ago(rows, BB_LENGTH - 1) - bb_offset, 0.0)
+        centred = close - bb_offset
+
+        return {
+            "gain_sum": gain_sum, "loss_sum": loss_sum, "n_changes": n_changes,
+            "sum_fast": self.sum_fast[rows] + close - drop_fast,
+            "sum_slow": self.sum_slow[rows] + close - drop_slow,
+            "bb_offset": bb_offset,
+            "bb_sum": self.bb_sum[rows] + centred - drop_bb,
+            "bb_sumsq": self.bb_sumsq[rows] + centred ** 2 - drop_bb ** 2,
+            "count": count + 1,
+        }
+
+    def _values(self, sums):
+        count, n_changes = sums["count"], sums["n_changes"]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            rsi = 100.0 * sums["gain_sum"] / (sums["gain_sum"] + sums["loss_sum"])
+        bb_mean = sums["bb_sum"] / BB_LENGTH
+        bb_dev = BB_STD * np.sqrt(np.clip(sums["bb_sumsq"] / BB_LENGTH - bb_mean ** 2, 0.0, None))
+        bb_mid = sums["bb_offset"] + bb_mean
+        bb_ready = count >= BB_LENGTH
+        return {
+            f"RSI_{RSI_LENGTH}": np.where(n_changes >= RSI_LENGTH, rsi, np.nan),
+            f"SMA_{SMA_FAST}": np.where(count >= SMA_FAST, sums["sum_fast"] / SMA_FAST, np.nan),
+            f"SMA_{SMA_SLOW}": np.where(count >= SMA_SLOW, sums["sum_slow"] / SMA_SLOW, np.nan),
+            f"BBL_{BB_LENGTH}_{BB_STD}": np.where(bb_ready, bb_mid - bb_dev, np.nan),
+            f"BBM_{BB_LENGTH}_{BB_STD}": np.where(bb_ready, bb_mid, np.nan),
+            f"BBU_{BB_LENGTH}_{BB_STD}": np.where(bb_ready, bb_mid + bb_dev, np.nan),
+        }
+
+    def push(self, rows, close, timestamp):
+        # Commit one closed bar for the given ticker rows
+        sums = self._next_sums(rows, close)
+        for name, values in sums.items():
+            getattr(self, name)[rows] = values
+        self.buffer[rows, self.pos[rows]] = close
+        self.pos[rows] = (self.pos[rows] + 1) % self.buffer_size
+        self.prev_close[rows] = close
+        self.last_ts[rows] = timestamp
+        self.since_resync[rows] += 1
+        stale = rows[self.since_resync[rows] >= RESYNC_EVERY]
+        if len(stale):
+            self._resync(stale)
+
+    def preview(self, rows, close):
+        # Indicator values as if `close` were appended, without touching the state (forming bar)
+        return self._values(self._next_sums(rows, close))
+
+    def _resync(self, rows):
+        # Exact window sums from the ring buffer, wiping accumulated rounding error
+        def window(length):
+            return np.stack([self._ago(rows, i) for i in range(length)], axis=1)
+        # nansum: windows that are not full yet hold NaN slots, exactly like the running sums skip them
+        self.sum_fast[rows] = np.nansum(window(SMA_FAST), axis=1)
+        self.sum_slow[rows] = np.nansum(window(SMA_SLOW), axis=1)
+        bb = window(BB_LENGTH) - self.bb_offset[rows, None]
+        self.bb_sum[rows] = np.nansum(bb, axis=1)
+        self.bb_sumsq[rows] = np.nansum(bb ** 2, axis=1)
+        self.since_resync[rows] = 0
+
+    # --- FEEDING FROM BARS ---
+    def catch_up(self, closes):
+        # closes: wide DataFrame (dates x tickers). Commits every bar newer than the stored state
+        # except each ticker's last one, which is still forming. Returns that live close per ticker.
+        self.ensure_tickers(closes.columns)
+        if closes.empty:
+            return pd.Series(np.nan, index=closes.columns, dtype=float)   # No bars: nothing to commit, no live close
+        rows = np.array([self.index[t] for t in closes.columns], dtype=np.int64)
+        stamps = closes.index.as_unit("ns").asi8   # Fixed unit: pandas may hold us or ns
+        # Skip the bars every ticker has already committed (callers pass the whole stored history);
+        # one committed bar is kept so a ticker without newer bars still has its live close
+        start = max(int(np.searchsorted(stamps, self.last_ts[rows].min(), side="right")) - 1, 0)
+        values, stamps = closes.iloc[start:].to_numpy(dtype=float), stamps[start:]
+        valid = np.isfinite(values)
+        last_row = len(values) - 1 - np.argmax(valid[::-1], axis=0)
+
+        for i, ts in enumerate(stamps):
+            todo = valid[i] & (ts > self.last_ts[rows]) & (i < last_row)
+            if todo.any():
+                self.push(rows[todo], values[i, todo], ts)
+
+        live = values[last_row, np.arange(values.shape[1])]
+        return pd.Series(live, index=closes.columns)
+
+    def latest(self, live_closes):
+        # Cross-sectional table (same columns as indicators.scan_table) from the state + forming bar
+        tickers = [t for t in live_closes.index if t in self.index and np.isfinite(live_closes[t])]
+        rows = np.array([self.index[t] for t in tickers], dtype=np.int64)
+        close = live_closes[tickers].to_numpy(dtype=float)
+        ind = self.preview(rows, close)
+        complete = np.isfinite(self.prev_close[rows])
+        for arr in ind.values():
+            complete &= np.isfinite(arr)
+
+        close, rows = close[complete], rows[complete]
+        # Close 24 hours before the forming bar (the previous bar on daily bars)
+        base = np.where(self.count[rows] >= self.change_bars, self._ago(rows, self.change_bars - 1), np.nan)
+        ind = {name: arr[complete] for name, arr in ind.items()}
+        rsi_now, sma_fast, sma_slow = ind[f"RSI_{RSI_LENGTH}"], ind[f"SMA_{SMA_FAST}"], ind[f"SMA_{SMA_SLOW}"]
+        bb_lower, bb_upper = ind[f"BBL_{BB_LENGTH}_{BB_STD}"], ind[f"BBU_{BB_LENGTH}_{BB_STD}"]
+        return pd.DataFrame({
+            "close": close,
+            "daily_change": (close / base - 1) * 100,
+            "rsi": rsi_now,
+            "sma_fast": sma_fast,
+            "sma_slow": sma_slow,
+            "bb_lower": bb_lower,
+            "bb_upper": bb_upper,
+            "rsi_signal": classify_rsi(rsi_now),
+            "trend": classify_trend(close, sma_fast, sma_slow),
+            "bb_status": classify_bbands(close, bb_lower, bb_upper),
+            "dist_sma_slow": (close / sma_slow - 1) * 100,
+        }, index=pd.Index(np.array(tickers)[complete], name="ticker"))
+
+    # --- PERSISTENCE ---
+    def save(self, interval="1d"):
+        path = STATE_FILE.format(interval=interval)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        arrays = {name: getattr(self, name) for name in ARRAY_FIELDS}
+        tmp_path = path + ".tmp.npz"
+        np.savez(tmp_path, tickers=np.array(self.tickers), buffer=self.buffer, **arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, interval="1d"):
+        path = STATE_FILE.format(interval=interval)
+        state = cls(change_bars=bars_per_day(interval))
+        if not os.path.exists(path):
+            return state
+        with np.load(path) as saved:
+            if saved["buffer"].shape[1] != state.buffer_size:
+                # Saved with another buffer size: start over, the next catch_up replays the stored bars
+                print(f"... Indicator state for {interval} has an old layout, rebuilding it")
+                return state
+            state.tickers = [str(t) for t in saved["tickers"]]
+            state.index = {t: i for i, t in enumerate(state.tickers)}
+            state.buffer = saved["buffer"]
+            for name, dtype in ARRAY_FIELDS.items():
+                setattr(state, name, saved[name].astype(dtype))
+        return state
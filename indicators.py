@@ -0,0 +1,159 @@
+import numpy as np
+import pandas as pd
+from lazy_import import lazy_module
+
+scipy_signal = lazy_module("scipy.signal")
+
+# --- SETTINGS ---
+RSI_LENGTH = 14
+SMA_FAST = 50
+SMA_SLOW = 200
+BB_LENGTH = 20
+BB_STD = 2.0
+
+RSI_OVERBOUGHT = 70
+RSI_OVERSOLD = 30
+
+# All functions below work on a 2-D float matrix (dates x tickers) in one pass.
+# Formulas follow pandas_ta (same column names too) so results match the old per-ticker calls.
+# NaN marks "no bar" (e.g. a coin listed later than the others).
+
+
+# --- CORE: EXPONENTIAL / ROLLING PRIMITIVES ---
+def rma(values, length):
+    # Wilder's moving average = pandas ewm(alpha=1/length, adjust=True, min_periods=length).mean()
+    # Numerator and weight sums are both first-order IIR filters, run over all columns at once.
+    valid = np.isfinite(values)
+    decay = 1.0 - 1.0 / length
+    num = scipy_signal.lfilter([1.0], [1.0, -decay], np.where(valid, values, 0.0), axis=0)
+    den = scipy_signal.lfilter([1.0], [1.0, -decay], valid.astype(float), axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        out = num / den
+    out[np.cumsum(valid, axis=0) < length] = np.nan
+    return out
+
+
+def rolling_sum(values, length):
+    # Window sums via cumulative sums; a window is valid only if it holds `length` real bars
+    valid = np.isfinite(values)
+    zero_pad = np.zeros((1, values.shape[1]))
+    csum = np.concatenate([zero_pad, np.cumsum(np.where(valid, values, 0.0), axis=0)])
+    ccount = np.concatenate([zero_pad, np.cumsum(valid, axis=0)])
+    out = np.full(values.shape, np.nan)
+    if values.shape[0] >= length:
+        window_sum = csum[length:] - csum[:-length]
+        window_count = ccount[length:] - ccount[:-length]
+        out[length - 1:] = np.where(window_count == length, window_sum, np.nan)
+    return out
+
+
+# --- INDICATORS ---
+def sma(close, length):
+    return rolling_sum(close, length) / length
+
+
+def rsi(close, length=RSI_LENGTH):
+    change = np.diff(close, axis=0, prepend=np.nan)
+    gains = rma(np.where(change > 0, change, np.where(np.isnan(change), np.nan, 0.0)), length)
+    losses = rma(np.where(change < 0, -change, np.where(np.isnan(change), np.nan, 0.0)), length)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return 100.0 * gains / (gains + losses)
+
+
+def bbands(close, length=BB_LENGTH, std=BB_STD):
+    # Population std (ddof=0) like pandas_ta; prices are centred per column first so
+    # the sum-of-squares trick does not lose precision on large prices like BTC
+    first_idx = np.argmax(np.isfinite(close), axis=0)
+    offset = np.nan_to_num(close[first_idx, np.arange(close.shape[1])])
+    centred = close - offset
+    mean = rolling_sum(centred, length) / length
+    var = rolling_sum(centred ** 2, length) / length - mean ** 2
+    dev = std * np.sqrt(np.clip(var, 0.0, None))
+    mid = mean + offset
+    return mid - dev, mid, mid + dev
+
+
+def compute_indicators(close):
+    close = np.asarray(close, dtype=float)
+    lower, mid, upper = bbands(close)
+    return {
+        f"RSI_{RSI_LENGTH}": rsi(close),
+        f"SMA_{SMA_FAST}": sma(close, SMA_FAST),
+        f"SMA_{SMA_SLOW}": sma(close, SMA_SLOW),
+        f"BBL_{BB_LENGTH}_{BB_STD}": lower,
+        f"BBM_{BB_LENGTH}_{BB_STD}": mid,
+        f"BBU_{BB_LENGTH}_{BB_STD}": upper,
+    }
+
+
+# --- SIGNAL CLASSIFICATION (VECTORIZED) ---
+def classify_rsi(rsi_values, overbought=RSI_OVERBOUGHT, oversold=RSI_OVERSOLD):
+    return np.select([rsi_values > overbought, rsi_values < oversold],
+                     ["Overbought", "Oversold"], default="Neutral")
+
+
+def classify_trend(close, sma_fast, sma_slow):
+    return np.select([(close > sma_fast) & (close > sma_slow), close > sma_slow],
+                     ["Strong Bullish", "Bullish"], default="Bearish")
+
+
+def classify_bbands(close, lower, upper):
+    return np.select([close > upper, close < lower],
+                     ["breaking the upper band", "touching the lower band"], default="within the bands")
+
+
+# --- FUNCTION: CROSS-SECTIONAL SCAN TABLE ---
+def scan_table(closes, change_bars=1):
+    # closes: wide DataFrame (dates x tickers) -> one row per ticker, built column by column.
+    # change_bars: bars in 24 hours (timeframes.bars_per_day), so daily_change is a 24h change on intraday bars
+    values = closes.to_numpy(dtype=float)
+    if len(values) == 0:
+        values = np.full((1, values.shape[1]), np.nan)   # No bars at all: every ticker lacks data, the table is empty
+    ind = compute_indicators(values)
+
+    # Last and previous rows where the close and every indicator are defined (like dropna())
+    complete = np.isfinite(values)
+    for arr in ind.values():
+        complete &= np.isfinite(arr)
+    has_two = complete.sum(axis=0) >= 2
+    n_rows = values.shape[0]
+    last_idx = n_rows - 1 - np.argmax(complete[::-1], axis=0)
+    before_last = complete.copy()
+    before_last[last_idx, np.arange(values.shape[1])] = False
+    prev_idx = n_rows - 1 - np.argmax(before_last[::-1], axis=0)
+
+    cols = np.arange(values.shape[1])[has_two]
+    last_idx, prev_idx = last_idx[has_two], prev_idx[has_two]
+    close = values[last_idx, cols]
+    # Daily bars: the previous complete bar (as before); intraday: the bar 24 hours before the last
+    base_idx = prev_idx if change_bars == 1 else last_idx - change_bars
+    base = np.where(base_idx >= 0, values[np.maximum(base_idx, 0), cols], np.nan)
+    latest = {name: arr[last_idx, cols] for name, arr in ind.items()}
+    rsi_now = latest[f"RSI_{RSI_LENGTH}"]
+    sma_fast = latest[f"SMA_{SMA_FAST}"]
+    sma_slow = latest[f"SMA_{SMA_SLOW}"]
+
+    table = pd.DataFrame({
+        "close": close,
+        "daily_change": (close / base - 1) * 100,
+        "rsi": rsi_now,
+        "sma_fast": sma_fast,
+        "sma_slow": sma_slow,
+        "bb_lower": latest[f"BBL_{BB_LENGTH}_{BB_STD}"],
+        "bb_upper": latest[f"BBU_{BB_LENGTH}_{BB_STD}"],
+        "rsi_signal": classify_rsi(rsi_now),
+        "trend": classify_trend(close, sma_fast, sma_slow),
+        "bb_status": classify_bbands(close, latest[f"BBL_{BB_LENGTH}_{BB_STD}"], latest[f"BBU_{BB_LENGTH}_{BB_STD}"]),
+        "dist_sma_slow": (close / sma_slow - 1) * 100,
+    }, index=pd.Index(closes.columns[has_two], name="ticker"))
+    return table
+
+
+# --- FUNCTION: SINGLE-TICKER FRAME (DEEP DIVE) ---
+def add_indicators(df):
+    # Same engine on a one-column matrix; appends the pandas_ta-named columns to an OHLCV frame
+    ind = compute_indicators(df[['Close']].to_numpy(dtype=float))
+    df = df.copy()
+    for name, arr in ind.items():
+        df[name] = arr[:, 0]
+    return df
@@ -0,0 +1,35 @@
+import importlib
+import threading
+
+# Heavy modules (yfinance, scipy.signal, pyarrow, smtplib, google.generativeai) are only needed
+# by some jobs/pages. lazy_module returns a stand-in that performs the real import on first
+# attribute access, so `import engine` or a Streamlit page rerun does not pay for them up front.
+# Use attribute access (`yf.download`), not `from module import name`, to keep it lazy.
+# Unlike importlib.util.LazyLoader this also works for submodules such as "scipy.signal",
+# whose parent package would otherwise be imported eagerly.
+
+_import_lock = threading.Lock()
+
+
+class LazyModule:
+    def __init__(self, name):
+        self._lazy_name = name
+        self._lazy_module = None
+
+    def _load(self):
+        if self._lazy_module is None:
+            with _import_lock:
+                if self._lazy_module is None:
+                    self._lazy_module = importlib.import_module(self._lazy_name)
+        return self._lazy_module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __repr__(self):
+        state = "loaded" if self._lazy_module is not None else "not loaded"
+        return f"<lazy module '{self._lazy_name}' ({state})>"
+
+
+def lazy_module(name):
+    return LazyModule(name)
@@ -0,0 +1,29 @@
+import streamlit as st
+from output_store import ResultStore
+
+# --- SETTINGS ---
+WATCH_SECONDS = 10   # How often each open page checks the manifest (one os.stat, no parsing)
+
+# Dashboard side of the results folder: every page reads through ONE ResultStore per server
+# process, so a publish is parsed once for all sessions, and a small fragment on each page
+# reruns it as soon as the engine has published a new version.
+
+
+@st.cache_resource # One parsed copy of the results per server process, shared by every session
+def get_result_store():
+    return ResultStore()
+
+
+def auto_refresh(store):
+    # Call once per page run, after the data was read. The fragment reruns on its own every
+    # WATCH_SECONDS; when the manifest version moved past the one this run rendered, the whole
+    # page reruns and picks up the new data.
+    rendered_version = store.version
+
+    @st.fragment(run_every=WATCH_SECONDS)
+    def watch():
+        store.refresh()
+        if store.version != rendered_version:
+            st.rerun()
+
+    watch()
@@ -0,0 +1,316 @@
+import os
+import sys
+import glob
+import json
+import time
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone, timedelta
+import numpy as np
+import pandas as pd
+
+try:
+    import resource   # Not available on Windows; peak RSS is then left out
+except ImportError:
+    resource = None
+
+# --- SETTINGS ---
+METRICS_DIR = "metrics"       # One JSON file per engine run: metrics/run_<time>_<kind>.json (not committed, see .gitignore)
+METRICS_KEEP = 336            # Run files kept (a week of 30-minute runs); the oldest are removed
+PROMETHEUS_FILE = os.environ.get("ENGINE_PROMETHEUS_FILE")   # Optional node_exporter textfile, rewritten every run
+PROMETHEUS_PREFIX = "crypto_engine"
+HEALTH_TABLE = "engine_health"   # Published daily summary of the run files, read by the Engine Health page
+HEALTH_DAYS = 30                 # Days kept in it
+
+# Usage, from the engine (or any script):
+#   with run_metrics("once", timeframe="1d"):
+#       with stage("fetch"):
+#           ...
+#   @stage("alert")                  (also works as a decorator)
+# Lower layers report into whatever run is active on their thread (record_fetch, cache_hit, error);
+# outside a run, e.g. on the dashboard, those calls do nothing.
+
+_local = threading.local()
+_latest = {}                  # Last summary per run kind, for the Prometheus file
+_latest_lock = threading.Lock()
+
+
+# --- HELPERS ---
+def peak_rss_bytes():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return int(peak if sys.platform == "darwin" else peak * 1024)
+
+
+def frame_bytes(df):
+    # Size of the bars as received (the HTTP payload size is not exposed by yfinance)
+    return 0 if df is None else int(df.memory_usage(deep=True).sum())
+
+
+def current():
+    return getattr(_local, "run", None)
+
+
+# --- RUN RECORD ---
+class RunMetrics:
+    def __init__(self, kind, timeframe=None):
+        self.kind = kind
+        self.timeframe = timeframe
+        self.started_at = datetime.now(timezone.utc)
+        self.start = time.perf_counter()
+        self.stages = {}      # {stage: {"seconds", "calls", "errors", "peak_rss_bytes"}}
+        self.stack = []       # Nested stages; errors are charged to the innermost one
+        self.fetch = {}       # {ticker: {"seconds", "bytes", "requests"}}
+        self.cache = {}       # {cache name: {"hits", "misses"}}
+        self.counters = {}
+        self.errors = 0
+
+    def stage_entry(self, name):
+        return self.stages.setdefault(name, {"seconds": 0.0, "calls": 0, "errors": 0, "peak_rss_bytes": None})
+
+    def add_error(self, n=1):
+        self.errors += n
+        if self.stack:
+            self.stage_entry(self.stack[-1])["errors"] += n
+
+    def summary(self):
+        seconds = [f["seconds"] for f in self.fetch.values()]
+        latency = {}
+        if seconds:
+            p50, p95 = np.percentile(seconds, [50, 95])
+            latency = {"mean": float(np.mean(seconds)), "p50": float(p50), "p95": float(p95), "max": float(max(seconds))}
+        return {
+            "kind": self.kind,
+            "timeframe": self.timeframe,
+            "started_at": self.started_at.isoformat(timespec='seconds'),
+            "seconds": round(time.perf_counter() - self.start, 4),
+            "stages": {name: {**s, "seconds": round(s["seconds"], 4)} for name, s in self.stages.items()},
+            "fetch": {
+                "tickers": len(self.fetch),
+                "requests": sum(f["requests"] for f in self.fetch.values()),
+                "bytes": sum(f["bytes"] for f in self.fetch.values()),
+                "latency": latency,
+                "per_ticker": {t: round(f["seconds"], 4) for t, f in self.fetch.items()},
+            },
+            "cache": {name: {**c, "hit_rate": c["hits"] / max(c["hits"] + c["misses"], 1)} for name, c in self.cache.items()},
+            "counters": self.counters,
+            "errors": self.errors,
+            "peak_rss_bytes": peak_rss_bytes(),
+        }
+
+
+# --- FUNCTION: RUN AND STAGE SCOPES ---
+@contextmanager
+def run_metrics(kind, timeframe=None, prometheus_file=None):
+    # Collects everything reported on this thread until the block ends, then writes the run file
+    run = RunMetrics(kind, timeframe)
+    previous, _local.run = current(), run
+    try:
+        yield run
+    except Exception:
+        run.add_error()
+        raise
+    finally:
+        _local.run = previous
+        save_run(run.summary(), prometheus_file or PROMETHEUS_FILE)
+
+
+@contextmanager
+def stage(name):
+    run = current()
+    if run is None:
+        yield
+        return
+    entry = run.stage_entry(name)
+    run.stack.append(name)
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        run.add_error()
+        raise
+    finally:
+        run.stack.pop()
+        entry["seconds"] += time.perf_counter() - start
+        entry["calls"] += 1
+        entry["peak_rss_bytes"] = peak_rss_bytes()
+
+
+# --- FUNCTION: REPORTING FROM LOWER LAYERS ---
+def record_fetch(ticker, seconds, nbytes=0):
+    run = current()
+    if run is None:
+        return
+    entry = run.fetch.setdefault(ticker, {"seconds": 0.0, "bytes": 0, "requests": 0})
+    entry["seconds"] += seconds
+    entry["bytes"] += nbytes
+    entry["requests"] += 1
+
+
+def cache_hit(name, hit, n=1):
+    run = current()
+    if run is None:
+        return
+    entry = run.cache.setdefault(name, {"hits": 0, "misses": 0})
+    entry["hits" if hit else "misses"] += n
+
+
+def gauge_value(name, value):
+    # Last value wins (e.g. the universe size of the run)
+    run = current()
+    if run is not None:
+        run.counters[name] = value
+
+
+def error(n=1):
+    run = current()
+    if run is not None:
+        run.add_error(n)
+
+
+# --- FUNCTION: WRITE RUN FILES ---
+def save_run(summary, prometheus_file=None):
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    stamp = summary["started_at"].replace(":", "").replace("-", "").replace("+0000", "Z")
+    path = os.path.join(METRICS_DIR, f"run_{stamp}_{summary['kind']}.json")
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(summary, f, indent=1)
+    os.replace(tmp_path, path)
+
+    # Evict the oldest runs beyond METRICS_KEEP (file names sort by start time)
+    files = sorted(glob.glob(os.path.join(METRICS_DIR, "run_*.json")))
+    for old in files[:-METRICS_KEEP]:
+        os.remove(old)
+
+    if prometheus_file:
+        with _latest_lock:
+            _latest[summary["kind"]] = summary
+            write_prometheus(list(_latest.values()), prometheus_file)
+    print(f"... Run metrics: {summary['seconds']:.2f}s, {summary['errors']} error(s) -> {path}")
+    return path
+
+
+def write_prometheus(summaries, path):
+    # Prometheus text exposition format, for node_exporter's textfile collector.
+    # summaries: the latest run of every kind (daemon jobs each report their own)
+    lines = []
+
+    def gauge(name, help_text, samples_of):
+        lines.append(f"# HELP {PROMETHEUS_PREFIX}_{name} {help_text}")
+        lines.append(f"# TYPE {PROMETHEUS_PREFIX}_{name} gauge")
+        for summary in summaries:
+            base = {"kind": summary["kind"], "timeframe": summary["timeframe"]}
+            for labels, value in samples_of(summary):
+                if value is not None:
+                    label_text = ",".join(f'{k}="{v}"' for k, v in {**base, **labels}.items())
+                    lines.append(f"{PROMETHEUS_PREFIX}_{name}{{{label_text}}} {value}")
+
+    gauge("last_run_timestamp_seconds", "Start time of the last run.",
+          lambda s: [({}, datetime.fromisoformat(s["started_at"]).timestamp())])
+    gauge("run_seconds", "Wall time of the last run.", lambda s: [({}, s["seconds"])])
+    gauge("stage_seconds", "Wall time per stage in the last run.",
+          lambda s: [({"stage": name}, st["seconds"]) for name, st in s["stages"].items()])
+    gauge("stage_errors", "Errors per stage in the last run.",
+          lambda s: [({"stage": name}, st["errors"]) for name, st in s["stages"].items()])
+    gauge("errors", "Errors in the last run.", lambda s: [({}, s["errors"])])
+    gauge("fetch_tickers", "Tickers downloaded in the last run.", lambda s: [({}, s["fetch"]["tickers"])])
+    gauge("fetch_requests", "Download requests in the last run.", lambda s: [({}, s["fetch"]["requests"])])
+    gauge("fetch_bytes", "Size of the bars downloaded in the last run.", lambda s: [({}, s["fetch"]["bytes"])])
+    gauge("fetch_latency_seconds", "Per-ticker download latency in the last run.",
+          lambda s: [({"quantile": q}, s["fetch"]["latency"].get(key)) for q, key in (("0.5", "p50"), ("0.95", "p95"), ("1", "max"))])
+    gauge("cache_hit_ratio", "Cache hit ratio in the last run.",
+          lambda s: [({"cache": name}, c["hit_rate"]) for name, c in s["cache"].items()])
+    gauge("peak_rss_bytes", "Peak resident memory of the engine process.", lambda s: [({}, s["peak_rss_bytes"])])
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write("\n".join(lines) + "\n")
+    os.replace(tmp_path, path)
+
+
+# --- FUNCTION: READ RUN HISTORY ---
+def load_runs(limit=METRICS_KEEP):
+    runs = []
+    for path in sorted(glob.glob(os.path.join(METRICS_DIR, "run_*.json")))[-limit:]:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                runs.append(json.load(f))
+        except (OSError, ValueError) as e:
+            print(f"!!! Skipping unreadable metrics file {path}: {e}")
+    return runs
+
+
+def run_rows(runs):
+    # One flat row per run file
+    rows = []
+    for run in runs:
+        row = {
+            "started_at": pd.Timestamp(run["started_at"]),
+            "kind": run["kind"],
+            "timeframe": run["timeframe"] or "-",
+            "seconds": run["seconds"],
+            "tickers": run["counters"].get("tickers"),
+            "errors": run["errors"],
+            "peak_rss_mb": run["peak_rss_bytes"] / 2**20 if run["peak_rss_bytes"] else None,
+            "fetch_mb": run["fetch"]["bytes"] / 2**20,
+            "fetch_requests": run["fetch"]["requests"],
+            "latency_p50": run["fetch"]["latency"].get("p50"),
+            "latency_p95": run["fetch"]["latency"].get("p95"),
+        }
+        for name, s in run["stages"].items():
+            row[f"stage_{name}"] = s["seconds"]
+        for name, c in run["cache"].items():
+            row[f"cache_{name}"] = c["hit_rate"] * 100
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+# --- FUNCTION: COMPACT HISTORY (PUBLISHED FOR THE DASHBOARD) ---
+# The run files stay local (CI cache); the dashboard gets one row per day, run kind and timeframe
+# with medians and worst values. Tolerances keep it from changing on every run, so it is only
+# committed when a day starts or the numbers move materially.
+def health_table(runs, previous=None, days=HEALTH_DAYS):
+    # previous: the published table; days before yesterday are kept from it (the local run files
+    # only cover the last METRICS_KEEP runs), yesterday and today are rebuilt from the run files
+    rows = run_rows(runs)
+    if rows.empty:
+        return previous
+    rows["day"] = rows["started_at"].dt.strftime("%Y-%m-%d")
+    medians = [c for c in rows.columns if c.startswith(("stage_", "cache_"))] + \
+              ["fetch_mb", "fetch_requests", "latency_p50", "latency_p95"]
+    grouped = rows.groupby(["day", "kind", "timeframe"])
+    table = grouped[medians].median()
+    table["seconds_p50"] = grouped["seconds"].median()
+    table["seconds_max"] = grouped["seconds"].max()
+    table["errors"] = grouped["errors"].sum()
+    table["tickers"] = grouped["tickers"].max()
+    table["peak_rss_mb"] = grouped["peak_rss_mb"].max()
+    table = table.reset_index()
+    table.index = pd.Index(table["day"] + " " + table["kind"] + " " + table["timeframe"], name="bucket")
+
+    if previous is not None and not previous.empty:
+        yesterday = (datetime.now(timezone.utc) - timedelta(days=1)).strftime("%Y-%m-%d")
+        older = previous[previous["day"] < yesterday]
+        table = pd.concat([older, table[(table["day"] >= yesterday) | ~table.index.isin(older.index)]])
+    first_day = (datetime.now(timezone.utc) - timedelta(days=days)).strftime("%Y-%m-%d")
+    table = table[table["day"] >= first_day].sort_values(["day", "kind", "timeframe"])
+    return table.round(4)
+
+
+def health_tolerances(table):
+    # Material change per column, in absolute units: a relative tolerance would republish on
+    # every run for sub-second stages, whose daily median moves by more than 20% from run to run
+    tolerances = {"errors": ("abs", 0), "tickers": ("abs", 0), "fetch_requests": ("rel", 0.2),
+                  "fetch_mb": ("abs", 1.0), "peak_rss_mb": ("abs", 50.0)}
+    for col in table.columns:
+        if col.startswith("cache_"):
+            tolerances[col] = ("abs", 5.0)        # Hit-rate points
+        elif col.startswith(("stage_", "seconds_")):
+            tolerances[col] = ("abs", 1.0)        # Seconds
+        elif col.startswith("latency_"):
+            tolerances[col] = ("abs", 0.1)
+    return tolerances
@@ -0,0 +1,338 @@
+import os
+import json
+import glob
+import hashlib
+import threading
+from datetime import datetime, timezone
+import numpy as np
+import pandas as pd
+from lazy_import import lazy_module
+from metrics import cache_hit
+
+feather = lazy_module("pyarrow.feather")
+
+# --- SETTINGS ---
+RESULTS_DIR = "results"
+MANIFEST_FILE = os.path.join(RESULTS_DIR, "manifest.json")
+
+# Change detection: values within tolerance of what is already published are not rewritten,
+# so float jitter between runs does not produce a new commit
+DEFAULT_TOLERANCE = ("rel", 1e-6)   # For table columns without their own (kind, value) tolerance
+ARRAY_RTOL = 1e-3                   # Result arrays (spectra, correlations)
+ARRAY_ATOL = 1e-6
+RESULT_DECIMALS = 4                 # Scalars in the manifest are compared after rounding
+DELTA_MAX_FRACTION = 0.5            # Above this share of changed rows, rewrite the full table
+
+# Layout of the results folder (everything the dashboard reads):
+#   manifest.json          small JSON: version, timestamps, file index and all scalar/list results
+#   <table>.arrow          Arrow IPC tables (uncompressed, so readers can memory-map them)
+#   <table>.delta.arrow    Optional: only the rows that changed since <table>.arrow was written
+#   <name>.npy             NumPy arrays (correlation triangles, spectra), memory-mapped on read
+# Every file is written to a temp name and renamed, and the manifest is replaced last,
+# so a reader never sees a half-written file.
+
+
+# --- HELPERS ---
+def atomic_path(path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path + ".tmp"
+
+
+def file_sha1(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def write_json_atomic(path, data):
+    tmp_path = atomic_path(path)
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, separators=(",", ":"), default=float)
+    os.replace(tmp_path, path)
+
+
+def write_table_file(name, df):
+    path = os.path.join(RESULTS_DIR, f"{name}.arrow")
+    tmp_path = atomic_path(path)
+    feather.write_feather(df, tmp_path, compression='uncompressed')
+    os.replace(tmp_path, path)
+    return {"path": os.path.basename(path), "format": "arrow", "rows": len(df), "sha1": file_sha1(path)}
+
+
+def write_array_file(name, array):
+    path = os.path.join(RESULTS_DIR, f"{name}.npy")
+    tmp_path = atomic_path(path)
+    with open(tmp_path, 'wb') as f:
+        np.save(f, np.ascontiguousarray(array))
+    os.replace(tmp_path, path)
+    return {"path": os.path.basename(path), "format": "npy", "shape": list(array.shape),
+            "dtype": str(array.dtype), "sha1": file_sha1(path)}
+
+
+def split_arrays(data, prefix, arrays):
+    # Walk a nested result dict: NumPy arrays go to their own files, the rest stays JSON
+    if isinstance(data, dict):
+        return {k: split_arrays(v, f"{prefix}.{k}", arrays) for k, v in data.items()}
+    if isinstance(data, np.ndarray):
+        arrays[prefix] = data
+        return {"$array": prefix}
+    if isinstance(data, np.generic):
+        return data.item()
+    return data
+
+
+def join_arrays(data, mmap=True):
+    if isinstance(data, dict):
+        if set(data) == {"$array"}:
+            return load_array(data["$array"], mmap=mmap)
+        return {k: join_arrays(v, mmap) for k, v in data.items()}
+    return data
+
+
+# --- CHANGE DETECTION ---
+def changed_rows(new, old, tolerances=None):
+    # Both frames indexed by their key. True for rows that are new or differ materially.
+    tolerances = tolerances or {}
+    common = new.index.intersection(old.index)
+    changed = pd.Series(True, index=new.index)
+    changed[common] = False
+    for col in new.columns:
+        if col not in old.columns:
+            changed[:] = True
+            break
+        a, b = new.loc[common, col], old.loc[common, col]
+        if pd.api.types.is_numeric_dtype(a) and pd.api.types.is_numeric_dtype(b):
+            kind, tol = tolerances.get(col, DEFAULT_TOLERANCE)
+            a, b = a.to_numpy(dtype=float), b.to_numpy(dtype=float)
+            limit = tol * np.abs(b) if kind == "rel" else tol
+            differs = (np.abs(a - b) > limit) | (np.isnan(a) != np.isnan(b))
+        else:
+            differs = (a.astype(str) != b.astype(str)).to_numpy()
+        changed[common] |= differs
+    return changed
+
+
+def quantize(data):
+    if isinstance(data, float):
+        return round(data, RESULT_DECIMALS) if np.isfinite(data) else str(data)
+    if isinstance(data, dict):
+        return {k: quantize(v) for k, v in data.items()}
+    if isinstance(data, list):
+        return [quantize(v) for v in data]
+    return data
+
+
+def content_hash(df):
+    # Hash of the table as published (index included), for cheap "did it change" checks by readers
+    return hashlib.sha1(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes()).hexdigest()
+
+
+def array_unchanged(name, array):
+    path = os.path.join(RESULTS_DIR, f"{name}.npy")
+    if not os.path.exists(path):
+        return False
+    old = np.load(path, mmap_mode='r')
+    if old.shape != array.shape or old.dtype != array.dtype:
+        return False
+    if array.dtype.kind in "fc":
+        return bool(np.allclose(array, old, rtol=ARRAY_RTOL, atol=ARRAY_ATOL, equal_nan=True))
+    return bool(np.array_equal(array, old))
+
+
+# --- FUNCTION: PUBLISH ---
+def load_manifest():
+    try:
+        with open(MANIFEST_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"version": 0, "files": {}, "results": {}}
+
+
+def publish_table(manifest, name, df, key=None, tolerances=None, delta=True):
+    # Returns True if anything was written
+    keyed = df.set_index(key) if key else df
+    entry = manifest["files"].get(name)
+    try:
+        current = load_table(name, manifest)
+        current = current.set_index(key) if key else current
+    except (FileNotFoundError, OSError):
+        current = None
+
+    if current is not None:
+        if not changed_rows(keyed, current, tolerances).any() and keyed.index.isin(current.index).all() \
+                and current.index.isin(keyed.index).all():
+            return False
+
+    base = None
+    if delta and entry is not None and current is not None:
+        base = feather.read_table(os.path.join(RESULTS_DIR, entry["path"]), memory_map=True).to_pandas()
+        base = base.set_index(key) if key else base
+    if base is not None and base.index.isin(keyed.index).all():
+        # Delta against the base file: rows that differ from it (cumulative since the base was written)
+        diff = changed_rows(keyed, base, tolerances)
+        if diff.mean() <= DELTA_MAX_FRACTION:
+            delta_df = keyed[diff].reset_index() if key else keyed[diff]
+            delta_entry = write_table_file(f"{name}.delta", delta_df)
+            entry["delta"] = delta_entry
+            entry["content_hash"] = content_hash(df)
+            print(f"... {name}: {int(diff.sum())} changed row(s) written as delta")
+            return True
+
+    # Full rewrite (first run, too many changes, or removed rows)
+    manifest["files"][name] = write_table_file(name, df)
+    manifest["files"][name]["content_hash"] = content_hash(df)
+    manifest["files"][name]["key"] = key
+    return True
+
+
+def publish(tables=None, results=None, keys=None, tolerances=None, delta=True):
+    # tables: {name: DataFrame}; results: {name: nested dict that may contain NumPy arrays}
+    # keys / tolerances: per-table row key column and {column: ("abs" | "rel", value)}
+    manifest = load_manifest()
+    keys, tolerances = keys or {}, tolerances or {}
+    changed = []
+
+    for name, df in (tables or {}).items():
+        table_changed = publish_table(manifest, name, df, keys.get(name), tolerances.get(name), delta)
+        # Hit: the output was already on disk and did not have to be rewritten
+        cache_hit("publish", not table_changed)
+        if table_changed:
+            changed.append(name)
+
+    for name, data in (results or {}).items():
+        arrays = {}
+        meta = split_arrays(data, name, arrays)
+        for array_name, array in arrays.items():
+            unchanged = array_unchanged(array_name, array)
+            cache_hit("publish", unchanged)
+            if not unchanged:
+                manifest["files"][array_name] = write_array_file(array_name, array)
+                changed.append(array_name)
+        if quantize(meta) != quantize(manifest["results"].get(name)):
+            manifest["results"][name] = meta
+            changed.append(name)
+
+    if not changed:
+        print("No material changes since the last publish; output left untouched.")
+        return manifest
+
+    manifest["version"] = manifest.get("version", 0) + 1
+    manifest["generated_at"] = datetime.now(timezone.utc).isoformat(timespec='seconds')
+    manifest["changed"] = changed
+    write_json_atomic(MANIFEST_FILE, manifest)
+
+    # Delta files the new manifest no longer points to (the table was rewritten in full)
+    referenced = {e["delta"]["path"] for e in manifest["files"].values() if "delta" in e}
+    for path in glob.glob(os.path.join(RESULTS_DIR, "*.delta.arrow")):
+        if os.path.basename(path) not in referenced:
+            os.remove(path)
+    print(f"Results published to {RESULTS_DIR}/ (version {manifest['version']}, changed: {', '.join(changed)})")
+    return manifest
+
+
+# --- FUNCTION: READ (DASHBOARD SIDE) ---
+def load_table(name, manifest=None):
+    manifest = manifest or load_manifest()
+    entry = manifest["files"].get(name)
+    if entry is None:
+        raise FileNotFoundError(f"No '{name}' table in {MANIFEST_FILE}")
+    df = feather.read_table(os.path.join(RESULTS_DIR, entry["path"]), memory_map=True).to_pandas()
+    if "delta" in entry:
+        # Rows in the delta file replace (or extend) the matching rows of the base snapshot
+        delta_df = feather.read_table(os.path.join(RESULTS_DIR, entry["delta"]["path"]), memory_map=True).to_pandas()
+        key = entry.get("key")
+        base = df.set_index(key) if key else df
+        delta_df = delta_df.set_index(key) if key else delta_df
+        merged = pd.concat([base[~base.index.isin(delta_df.index)], delta_df])
+        order = base.index.append(delta_df.index[~delta_df.index.isin(base.index)])
+        df = merged.loc[order]
+        df = df.reset_index() if key else df
+    return df
+
+
+def load_array(name, mmap=True):
+    return np.load(os.path.join(RESULTS_DIR, f"{name}.npy"), mmap_mode='r' if mmap else None)
+
+
+def load_results(name, manifest=None, mmap=True):
+    manifest = manifest or load_manifest()
+    if name not in manifest["results"]:
+        raise FileNotFoundError(f"No '{name}' results in {MANIFEST_FILE}")
+    return join_arrays(manifest["results"][name], mmap)
+
+
+# --- CLASS: SHARED, CHANGE-DRIVEN READER (DASHBOARD SIDE) ---
+def manifest_token():
+    # Cheap change check: the manifest is replaced (new mtime/size) on every publish that changed something
+    try:
+        stat = os.stat(MANIFEST_FILE)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+class ResultStore:
+    # One instance per dashboard process (st.cache_resource), shared by every session.
+    # Tables and results are parsed once and kept until the manifest says their files changed;
+    # between publishes a read costs one os.stat of the manifest.
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._token = False              # Never equal to a real token, so the first read loads the manifest
+        self.manifest = {"version": 0, "files": {}, "results": {}}
+        self._parsed = {}                # (kind, name) -> (signature, parsed value)
+        self.parses = 0
+
+    def refresh(self):
+        # Returns True if a new manifest was loaded
+        token = manifest_token()
+        if token == self._token:
+            return False
+        with self._lock:
+            if token != self._token:
+                self.manifest = load_manifest()
+                self._token = token
+                return True
+        return False
+
+    @property
+    def version(self):
+        return self.manifest.get("version", 0)
+
+    def _signature(self, kind, name):
+        files = self.manifest["files"]
+        if kind == "table":
+            entry = files.get(name)
+            if entry is None:
+                raise FileNotFoundError(f"No '{name}' table in {MANIFEST_FILE}")
+            return (entry.get("sha1"), entry.get("delta", {}).get("sha1"))
+        meta = self.manifest["results"].get(name)
+        if meta is None:
+            raise FileNotFoundError(f"No '{name}' results in {MANIFEST_FILE}")
+        arrays = sorted((k, e.get("sha1")) for k, e in files.items() if k.startswith(f"{name}."))
+        return (json.dumps(meta, sort_keys=True, default=str), tuple(arrays))
+
+    def _get(self, kind, name, loader, parse):
+        self.refresh()
+        manifest = self.manifest
+        signature = self._signature(kind, name)
+        cached = self._parsed.get((kind, name))
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        with self._lock:
+            cached = self._parsed.get((kind, name))
+            if cached is not None and cached[0] == signature:
+                return cached[1]
+            value = loader(name, manifest)
+            value = parse(value) if parse else value
+            self._parsed[(kind, name)] = (signature, value)
+            self.parses += 1
+        return value
+
+    # Returned objects are shared between sessions: treat them as read-only
+    def table(self, name, parse=None):
+        return self._get("table", name, load_table, parse)
+
+    def results(self, name, parse=None):
+        return self._get("results", name, load_results, parse)
@@ -1,21 +1,27 @@
 import streamlit as st
-import json
 import plotly.graph_objects as go
 import pandas as pd
+import numpy as np
+from correlation import matrix_from_upper
+from output_store import MANIFEST_FILE
+from live_results import get_result_store, auto_refresh
+from timeframes import TIMEFRAMES, output_name
 
 st.set_page_config(layout="wide", page_title="Advanced Analysis")
 st.title("🔬 Advanced Analysis")
-st.markdown("This analysis is updated automatically by the engine.")
+st.markdown("This analysis is updated automatically by the engine; the page refreshes itself when it does.")
 
 # --- SETTINGS ---
-DATA_FILE = "advanced_analysis.json"
+DATA_FILE = MANIFEST_FILE
 
 # --- LOGIC ---
-@st.cache_data(ttl=600) # Re-read from disk every 10 minutes
-def load_data():
+store = get_result_store()
+
+def load_data(name):
     try:
-        with open(DATA_FILE, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        # Small values come from the manifest, large arrays are memory-mapped .npy files.
+        # Parsed once per publish and shared by every session (read-only).
+        data = store.results(name)
         return data
     except FileNotFoundError:
         st.error(f"Data file '{DATA_FILE}' not found. Please wait for the first automated run or run `5_engine.py` manually.")
@@ -25,14 +31,23 @@ def load_data():
         return None
 
 # --- DISPLAY ---
-advanced_data = load_data()
+# Timeframes the engine has published results for
+store.refresh()
+published = store.manifest.get("results", {})
+available = [tf for tf in TIMEFRAMES if output_name("advanced_analysis", tf) in published] or ["1d"]
+timeframe = st.sidebar.selectbox("Timeframe:", available, index=available.index("1d") if "1d" in available else 0)
+advanced_data = load_data(output_name("advanced_analysis", timeframe))
 
 if advanced_data:
+    # Windows and cycle periods are computed in bars; show them in days (daily) or hours (intraday)
+    bar_minutes = advanced_data.get('bar_minutes', 1440)
+    unit, unit_scale = ("Days", bar_minutes / 1440) if bar_minutes >= 1440 else ("Hours", bar_minutes / 60)
+
     if 'error' in advanced_data:
         st.error(f"An error occurred during the advanced analysis calculation: {advanced_data['error']}")
     
     # --- 1. Display Correlation Analysis ---
-    st.subheader("Correlation Analysis - Last 30 Days")
+    st.subheader("Correlation Analysis")
     if 'correlation' in advanced_data:
         col1, col2 = st.columns(2)
         try:
@@ -46,23 +61,60 @@ if advanced_data:
             )
         except KeyError:
             st.warning("Correlation data missing.")
+
+        # --- Full correlation matrix for the whole scan universe ---
+        corr = advanced_data['correlation']
+        if 'windows' in corr and corr['windows']:
+            window = st.radio(f"Rolling window ({timeframe} bars):", list(corr['windows'].keys()), index=min(1, len(corr['windows']) - 1), horizontal=True)
+            tickers = corr['tickers']
+            matrix = matrix_from_upper(corr['windows'][window], len(tickers))
+            labels = [t.replace("-USD", "") for t in tickers]
+            fig_corr = go.Figure(go.Heatmap(
+                z=matrix, x=labels, y=labels,
+                zmin=-1, zmax=1, colorscale='RdBu', reversescale=True,
+                hovertemplate="%{y} / %{x}: %{z:.3f}<extra></extra>"
+            ))
+            fig_corr.update_layout(title=f"Correlation Matrix - {window}-Bar ({timeframe}) Rolling Window", height=600, yaxis_autorange='reversed')
+            st.plotly_chart(fig_corr, use_container_width=True)
+
+            history = corr.get('mean_history', {}).get(window)
+            if history and history['dates']:
+                fig_mean = go.Figure(go.Scatter(x=history['dates'], y=history['values'], mode='lines', name='Mean Correlation'))
+                fig_mean.update_layout(title=f"Average Pairwise Correlation ({window}-Bar {timeframe} Window)", yaxis_title="Correlation", height=300)
+                st.plotly_chart(fig_mean, use_container_width=True)
     else:
         st.warning("No correlation data found.")
 
     st.markdown("---")
 
     # --- 2. Display Cyclical Analysis (FFT) ---
-    st.subheader("Cyclical Analysis (FFT) - Bitcoin (based on 2 years)")
-    st.markdown("The chart shows the 'power' of each cycle (in days). High peaks represent statistically dominant cycles.")
-    
-    if 'fft_analysis' in advanced_data:
+    spectral = advanced_data.get('spectral')
+    history_text = f"{spectral['bars']} {timeframe} bars" if spectral else "2 years"
+    st.subheader(f"Cyclical Analysis (FFT) - based on {history_text}")
+    st.markdown(f"The chart shows the 'power' of each cycle (in {unit.lower()}). High peaks represent statistically dominant cycles.")
+
+    if spectral:
+        coin = st.selectbox("Select coin:", spectral['tickers'], index=spectral['tickers'].index("BTC-USD") if "BTC-USD" in spectral['tickers'] else 0)
+    else:
+        coin = "BTC-USD"
+    coin_name = coin.replace("-USD", "")
+
+    if spectral or 'fft_analysis' in advanced_data:
         try:
-            # Load data for the graph from JSON
-            periods = advanced_data['fft_analysis']['fft_periods']
-            power = advanced_data['fft_analysis']['fft_power']
-            dominant_periods = advanced_data['fft_analysis']['dominant_periods_days']
+            # Load data for the graph from JSON (all coins if available, else the Bitcoin-only format)
+            if spectral:
+                i = spectral['tickers'].index(coin)
+                periods = spectral['periods']
+                power = spectral['amplitude'][i]
+                dominant_periods = spectral['dominant_periods'][i]
+            else:
+                periods = advanced_data['fft_analysis']['fft_periods']
+                power = advanced_data['fft_analysis']['fft_power']
+                dominant_periods = advanced_data['fft_analysis']['dominant_periods_days']
+            periods = np.asarray(periods) * unit_scale
+            dominant_periods = [p * unit_scale for p in dominant_periods]
 
-            if not periods or not power:
+            if len(periods) == 0 or len(power) == 0:
                 st.info("No spectrum data to display.")
             else:
                 # Create Plotly figure
@@ -77,8 +129,8 @@ if advanced_data:
                 ))
                 
                 # Add markers for the dominant peaks we found
-                if dominant_periods:
-                    st.write("Dominant cycles identified (in days):")
+                if len(dominant_periods) > 0:
+                    st.write(f"Dominant cycles identified (in {unit.lower()}):")
                     st.code(f"{[round(p, 1) for p in dominant_periods]}")
                     
                     # Build data to display peaks
@@ -95,10 +147,22 @@ if advanced_data:
                 else:
                     st.info("No strong dominant cycles were identified.")
 
+                # Welch estimate (averaged over segments): smoother, less prone to one-off spikes
+                if spectral and 'welch_periods' in spectral:
+                    fig.add_trace(go.Scatter(
+                        x=np.asarray(spectral['welch_periods']) * unit_scale,
+                        y=spectral['welch_density'][i],
+                        mode='lines',
+                        name='Welch Density',
+                        line=dict(dash='dot'),
+                        yaxis='y2'
+                    ))
+                    fig.update_layout(yaxis2=dict(title="Welch Density", overlaying='y', side='right', showgrid=False))
+
                 # Update graph layout
                 fig.update_layout(
-                    title="Bitcoin Cycle Periodogram",
-                    xaxis_title="Period (Days) - Logarithmic Scale",
+                    title=f"{coin_name} Cycle Periodogram",
+                    xaxis_title=f"Period ({unit}) - Logarithmic Scale",
                     yaxis_title="Power (Amplitude)",
                     xaxis_type="log", # Use log scale for X-axis - critical for this type of graph
                     height=500
@@ -106,6 +170,20 @@ if advanced_data:
                 
                 st.plotly_chart(fig, use_container_width=True)
 
+            # --- Spectrogram: how the dominant cycles drift over time ---
+            if spectral and 'spectrogram' in spectral:
+                st.subheader(f"Cycle Drift (Spectrogram) - {coin_name}")
+                st.markdown("Each column is the spectrum of a sliding window ending on that date. Bright bands that move up or down are cycles that are lengthening or shortening.")
+                fig_sg = go.Figure(go.Heatmap(
+                    x=spectral['spectrogram_dates'],
+                    y=np.asarray(spectral['spectrogram_periods']) * unit_scale,
+                    z=spectral['spectrogram'][i].T,   # periods x time
+                    colorscale='Viridis',
+                    colorbar=dict(title="Amplitude")
+                ))
+                fig_sg.update_layout(yaxis_type="log", yaxis_title=f"Period ({unit})", xaxis_title="Window End", height=500)
+                st.plotly_chart(fig_sg, use_container_width=True)
+
         except KeyError:
             st.warning("FFT data is missing or in an incorrect format.")
         except Exception as e:
@@ -114,9 +192,12 @@ if advanced_data:
         st.warning("No FFT data found.")
         
     st.markdown("---")
-    # Raw Data (JSON)
+    # Raw Data (manifest; large arrays are listed by file name)
     st.subheader("Raw Data (JSON)")
-    st.json(advanced_data)
+    with st.expander("Show raw data"):
+        st.json(store.manifest.get("results", {}), expanded=False)
 
 else:
     st.warning("No data loaded.")
+
+auto_refresh(store)
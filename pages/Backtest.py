@@ -0,0 +1,114 @@
+import streamlit as st
+import plotly.graph_objects as go
+import pandas as pd
+from output_store import MANIFEST_FILE
+from live_results import get_result_store, auto_refresh
+from timeframes import TIMEFRAMES, output_name
+
+st.set_page_config(layout="wide", page_title="Backtest")
+st.title("🧪 Signal Backtest")
+st.markdown("How the scanner's labels would have performed on the stored history. Run `python backtest.py` to refresh.")
+
+# --- SETTINGS ---
+DATA_FILE = MANIFEST_FILE
+STRATEGY_NAMES = {
+    "rsi_reversion": "RSI: buy Oversold, sell Overbought",
+    "trend_strong": "Trend: long while Strong Bullish",
+    "trend_bullish": "Trend: long while Bullish or Strong Bullish",
+    "buy_hold": "Buy & Hold (benchmark)",
+}
+# Parameters each strategy actually depends on (the sweep heatmap axes)
+SWEEP_AXES = {
+    "rsi_reversion": ("oversold", "overbought"),
+    "trend_strong": ("sma_fast", "sma_slow"),
+    "trend_bullish": ("sma_fast", "sma_slow"),
+}
+
+# --- LOGIC ---
+store = get_result_store()
+
+def load_data(name):
+    try:
+        # Parsed once per publish and shared by every session (read-only)
+        return store.results(name), store.table(f"{name}_runs"), store.table(f"{name}_signals")
+    except FileNotFoundError:
+        st.error(f"No backtest results in '{DATA_FILE}'. Run `python backtest.py` after the engine has filled the bar store.")
+        return None, pd.DataFrame(), pd.DataFrame()
+    except Exception as e:
+        st.error(f"Error loading data: {e}")
+        return None, pd.DataFrame(), pd.DataFrame()
+
+def summarize(runs):
+    # Across coins: median return and drawdown, mean hit rate, total trades
+    return runs.groupby("strategy").agg(
+        median_return=("total_return", "median"),
+        median_drawdown=("max_drawdown", "median"),
+        hit_rate=("hit_rate", "mean"),
+        exposure=("exposure", "mean"),
+        trades=("trades", "sum"),
+    ).reindex([s for s in STRATEGY_NAMES if s in set(runs["strategy"])])
+
+# --- DISPLAY ---
+store.refresh()
+published = store.manifest.get("results", {})
+available = [tf for tf in TIMEFRAMES if output_name("backtest", tf) in published] or ["1d"]
+timeframe = st.sidebar.selectbox("Timeframe:", available, index=available.index("1d") if "1d" in available else 0)
+meta, runs, signals = load_data(output_name("backtest", timeframe))
+
+if meta and not runs.empty:
+    defaults = meta["default_params"]
+    st.caption(f"{len(meta['tickers'])} coins, {meta['bars']} {timeframe} bars ({meta['start'][:10]} → {meta['end'][:10]}), "
+               f"{len(runs) // max(len(meta['tickers']), 1)} strategy runs")
+
+    # --- 1. The scanner's own settings ---
+    st.subheader(f"Scanner Settings (RSI {defaults['oversold']}/{defaults['overbought']}, SMA {defaults['sma_fast']}/{defaults['sma_slow']})")
+    is_default = pd.Series(True, index=runs.index)
+    for key, value in defaults.items():
+        is_default &= runs[key] == value
+    default_runs = runs[is_default]
+    summary = summarize(default_runs).rename(index=STRATEGY_NAMES)
+    st.dataframe(summary.style.format({"median_return": "{:,.1f}%", "median_drawdown": "{:,.1f}%",
+                                       "hit_rate": "{:.1f}%", "exposure": "{:.0f}%", "trades": "{:,.0f}"}),
+                 use_container_width=True)
+
+    strategy = st.selectbox("Strategy:", list(STRATEGY_NAMES), format_func=STRATEGY_NAMES.get)
+    per_coin = default_runs[default_runs["strategy"] == strategy].set_index("ticker")
+    fig = go.Figure(go.Bar(x=per_coin.index.str.replace("-USD", ""), y=per_coin["total_return"], name="Total Return",
+                           marker_color=["green" if r > 0 else "red" for r in per_coin["total_return"]]))
+    fig.update_layout(title=f"Total Return per Coin - {STRATEGY_NAMES[strategy]}", yaxis_title="Return (%)", height=400)
+    st.plotly_chart(fig, use_container_width=True)
+    with st.expander("Per-coin details"):
+        st.dataframe(per_coin[["total_return", "max_drawdown", "hit_rate", "exposure", "trades"]], use_container_width=True)
+
+    # --- 2. Parameter sweep ---
+    if strategy in SWEEP_AXES:
+        x_key, y_key = SWEEP_AXES[strategy]
+        st.subheader("Parameter Sweep")
+        # Fix the parameters this strategy ignores at the scanner's values
+        sweep = runs[runs["strategy"] == strategy]
+        for key, value in defaults.items():
+            if key not in (x_key, y_key):
+                sweep = sweep[sweep[key] == value]
+        grid = sweep.groupby([y_key, x_key])["total_return"].median().unstack()
+        if grid.size > 1:
+            fig_grid = go.Figure(go.Heatmap(z=grid.to_numpy(), x=[str(c) for c in grid.columns], y=[str(i) for i in grid.index],
+                                            colorscale='RdYlGn', colorbar=dict(title="Median return (%)"),
+                                            hovertemplate=f"{x_key}=%{{x}}, {y_key}=%{{y}}: %{{z:.1f}}%<extra></extra>"))
+            fig_grid.update_layout(xaxis_title=x_key, yaxis_title=y_key, height=450,
+                                   title=f"Median Total Return Across Coins - {STRATEGY_NAMES[strategy]}")
+            st.plotly_chart(fig_grid, use_container_width=True)
+        else:
+            st.info("The backtest was run without a parameter grid.")
+
+    # --- 3. Did the labels pay off? ---
+    st.markdown("---")
+    st.subheader("Forward Returns After Each Scanner Label")
+    st.markdown("Average return N bars after a coin carried the label, pooled over all coins and bars.")
+    if not signals.empty:
+        table = signals.pivot_table(index=["label_kind", "label"], columns="horizon", values=["mean_return", "hit_rate"])
+        table.columns = [f"{'Mean return' if kind == 'mean_return' else 'Hit rate'} +{h} bars" for kind, h in table.columns]
+        st.dataframe(table.style.format("{:.2f}%"), use_container_width=True)
+else:
+    st.warning("No data loaded.")
+
+auto_refresh(store)
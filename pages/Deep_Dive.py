@@ -1,10 +1,13 @@
+import time
 import streamlit as st
-import yfinance as yf
 import pandas as pd
-import pandas_ta as ta
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
-import google.generativeai as genai 
+from data_service import DataService
+from timeframes import TIMEFRAMES, is_intraday
+from downsample import downsample_frame
+from indicators import classify_rsi, classify_bbands
+from analysis_cache import AnalysisCache, COIN_LIST, technical_state, make_client, ANALYSIS_MODEL
 
 st.set_page_config(layout="wide", page_title="Deep Dive Analysis")
 st.title("ניתוח טכני מעמיק")
@@ -12,53 +15,46 @@ st.title("ניתוח טכני מעמיק")
 # --- Configure Gemini API Key ---
 try:
     # The app will read the key from Streamlit Secrets
-    genai.configure(api_key=st.secrets["GEMINI_API_KEY"])
-    GEMINI_ENABLED = True
+    GEMINI_API_KEY = st.secrets["GEMINI_API_KEY"]
 except Exception as e:
+    GEMINI_API_KEY = None
+# ANALYSIS_MODEL=stub runs the page without a key (local tests); the Gemini SDK is only imported on a cache miss
+GEMINI_ENABLED = GEMINI_API_KEY is not None or ANALYSIS_MODEL == "stub"
+if not GEMINI_ENABLED:
     st.sidebar.error("Gemini API Key not set.")
     st.sidebar.caption("To enable AI analysis, add 'GEMINI_API_KEY' to your Streamlit Cloud app Secrets.")
-    GEMINI_ENABLED = False
 
 # --- Settings and User Input ---
 st.sidebar.header("בקרת ניתוח")
-COIN_LIST = {
-    "Bitcoin (BTC)": "BTC-USD",
-    "Ethereum (ETH)": "ETH-USD",
-    "Solana (SOL)": "SOL-USD",
-    "Cardano (ADA)": "ADA-USD"
-}
 selected_coin_name = st.sidebar.selectbox("בחר מטבע:", list(COIN_LIST.keys()))
 ticker = COIN_LIST[selected_coin_name]
 timeframe = st.sidebar.selectbox("בחר טווח זמן:", ["שנה (1y)", "6 חודשים (6mo)", "3 חודשים (3mo)", "חודש (1mo)"], index=0)
 period_map = {"שנה (1y)": "1y", "6 חודשים (6mo)": "6mo", "3 חודשים (3mo)": "3mo", "חודש (1mo)": "1mo"}
 selected_period = period_map[timeframe]
+# Bar size: indicator lengths are in bars (RSI 14 = 14 hours on 1h bars). Intraday history is short (days to weeks).
+bar_timeframe = st.sidebar.selectbox("גודל נר:", list(TIMEFRAMES), index=list(TIMEFRAMES).index("1d"))
 
 # --- Data Processing Logic ---
-@st.cache_data(ttl=300) # Cache for 5 minutes
-def get_data(ticker, period):
-    # --- FIX #4: Added group_by='column' to flatten the columns ---
-    df = yf.download(ticker, period=period, group_by='column')
-    
-    if df.empty: return None
-    df.ta.sma(length=50, append=True)
-    df.ta.sma(length=200, append=True)
-    df.ta.rsi(length=14, append=True)
-    df.ta.bbands(length=20, std=2, append=True)
-    df = df.dropna()
-    return df
+@st.cache_resource # One data service per server process, shared by all sessions and reruns
+def get_data_service():
+    return DataService()
+
+data_service = get_data_service()
+data_service.warm(COIN_LIST.values(), bar_timeframe)  # Background refresh of every selectable coin (non-blocking)
+
+def get_data(ticker, period, bar_timeframe):
+    # The longest history is downloaded and analysed once per coin; shorter periods are slices of it
+    return data_service.get(ticker, period, bar_timeframe)
 
 # --- Function to call Gemini ---
-@st.cache_data(ttl=600) # Cache analysis for 10 minutes
-def get_gemini_analysis(prompt):
-    try:
-        model = genai.GenerativeModel('gemini-1.5-flash')
-        response = model.generate_content(prompt)
-        return response.text
-    except Exception as e:
-        return f"Error generating analysis: {e}"
+@st.cache_resource # One model client and one disk-backed analysis cache per server process, shared by all sessions
+def get_analyst():
+    return make_client(ANALYSIS_MODEL, GEMINI_API_KEY), AnalysisCache()
+
+LINE_COLUMNS = ['SMA_50', 'SMA_200', 'BBL_20_2.0', 'BBU_20_2.0', 'RSI_14']
 
 # --- Run and Collect Data ---
-data_df = get_data(ticker, selected_period)
+data_df = get_data(ticker, selected_period, bar_timeframe)
 
 if data_df is None or data_df.empty:
     st.error("לא הצלחתי להוריד נתונים. נסה מטבע או טווח זמן אחר.")
@@ -74,16 +70,12 @@ else:
     bb_high = last_row['BBU_20_2.0']
     bb_low = last_row['BBL_20_2.0']
 
-    if last_rsi > 70: rsi_status = "Overbought"
-    elif last_rsi < 30: rsi_status = "Oversold"
-    else: rsi_status = "Neutral"
+    rsi_status = str(classify_rsi(last_rsi))
 
     status_vs_50 = "above" if last_price > ma_50 else "below"
     status_vs_200 = "above" if last_price > ma_200 else "below"
     
-    if last_price > bb_high: bb_status = "breaking the upper band"
-    elif last_price < bb_low: bb_status = "touching the lower band"
-    else: bb_status = "within the bands"
+    bb_status = str(classify_bbands(last_price, bb_low, bb_high))
 
     # --- Display Metrics ---
     col1, col2, col3 = st.columns(3)
@@ -95,62 +87,61 @@ else:
     
     # --- Display Graphs ---
     st.subheader("גרפים (אינטראקטיביים - ניתן לבצע זום)")
+    # Zoom happens on the server: a narrower range is re-downsampled from the full-resolution bars,
+    # so zooming in brings back detail instead of stretching the coarse overview
+    st.sidebar.subheader("תצוגת גרף")
+    chart_width = st.sidebar.slider("רוחב גרף (פיקסלים)", 600, 3000, 1400, step=100)
+    first_day, last_day = data_df.index[0].to_pydatetime(), data_df.index[-1].to_pydatetime()
+    view_start, view_end = st.sidebar.slider("טווח תצוגה (זום)", min_value=first_day, max_value=last_day,
+                                             value=(first_day, last_day), format="DD/MM/YY HH:mm" if is_intraday(bar_timeframe) else "DD/MM/YY",
+                                             key=f"zoom_{ticker}_{selected_period}_{bar_timeframe}")
+    view_df = data_df.loc[view_start:view_end]
+
+    render_start = time.perf_counter()
+    chart = downsample_frame(view_df, chart_width, LINE_COLUMNS)
+    candles, lines = chart["candles"], chart["lines"]
     fig = make_subplots(rows=3, cols=1, shared_xaxes=True,
                         vertical_spacing=0.05,
                         row_heights=[0.6, 0.2, 0.2],
                         subplot_titles=(f"גרף מחיר, ממוצעים נעים, ורצועות בולינגר", "RSI (מדד חוזק יחסי)", "נפח מסחר (Volume)"))
-    fig.add_trace(go.Candlestick(x=data_df.index, open=data_df['Open'], high=data_df['High'], low=data_df['Low'], close=data_df['Close'], name='מחיר'), row=1, col=1)
-    fig.add_trace(go.Scatter(x=data_df.index, y=data_df['SMA_50'], mode='lines', name='SMA 50', line=dict(color='orange')), row=1, col=1)
-    fig.add_trace(go.Scatter(x=data_df.index, y=data_df['SMA_200'], mode='lines', name='SMA 200', line=dict(color='blue', dash='dash')), row=1, col=1)
-    fig.add_trace(go.Scatter(x=data_df.index, y=data_df['BBL_20_2.0'], mode='lines', name='רצועה תחתונה', line=dict(color='gray', width=1)), row=1, col=1)
-    fig.add_trace(go.Scatter(x=data_df.index, y=data_df['BBU_20_2.0'], mode='lines', name='רצועה עליונה', line=dict(color='gray', width=1), fill='tonexty', fillcolor='rgba(128,128,128,0.1)'), row=1, col=1)
-    fig.add_trace(go.Scatter(x=data_df.index, y=data_df['RSI_14'], mode='lines', name='RSI', line=dict(color='purple')), row=2, col=1)
+    fig.add_trace(go.Candlestick(x=candles.index, open=candles['Open'], high=candles['High'], low=candles['Low'], close=candles['Close'], name='מחיר'), row=1, col=1)
+    fig.add_trace(go.Scatter(x=lines['SMA_50'].index, y=lines['SMA_50'], mode='lines', name='SMA 50', line=dict(color='orange')), row=1, col=1)
+    fig.add_trace(go.Scatter(x=lines['SMA_200'].index, y=lines['SMA_200'], mode='lines', name='SMA 200', line=dict(color='blue', dash='dash')), row=1, col=1)
+    fig.add_trace(go.Scatter(x=lines['BBL_20_2.0'].index, y=lines['BBL_20_2.0'], mode='lines', name='רצועה תחתונה', line=dict(color='gray', width=1)), row=1, col=1)
+    fig.add_trace(go.Scatter(x=lines['BBU_20_2.0'].index, y=lines['BBU_20_2.0'], mode='lines', name='רצועה עליונה', line=dict(color='gray', width=1), fill='tonexty', fillcolor='rgba(128,128,128,0.1)'), row=1, col=1)
+    fig.add_trace(go.Scatter(x=lines['RSI_14'].index, y=lines['RSI_14'], mode='lines', name='RSI', line=dict(color='purple')), row=2, col=1)
     fig.add_hline(y=70, line_dash="dash", line_color="red", row=2, col=1)
     fig.add_hline(y=30, line_dash="dash", line_color="green", row=2, col=1)
-    fig.add_trace(go.Bar(x=data_df.index, y=data_df['Volume'], name='Volume', marker_color='teal'), row=3, col=1)
-    fig.update_layout(height=800, showlegend=True, xaxis_rangeslider_visible=False, xaxis3_rangeslider_visible=True, title_text=f"ניתוח טכני עבור {selected_coin_name} ({ticker})")
-    fig.update_xaxes(rangebreaks=[dict(bounds=["sat", "mon"])])
+    fig.add_trace(go.Bar(x=candles.index, y=candles['Volume'], name='Volume', marker_color='teal'), row=3, col=1)
+    fig.update_layout(height=800, showlegend=True, xaxis_rangeslider_visible=False, xaxis3_rangeslider_visible=True, title_text=f"ניתוח טכני עבור {selected_coin_name} ({ticker}, {bar_timeframe})")
+    payload_bytes = len(fig.to_json())
+    render_ms = (time.perf_counter() - render_start) * 1000
     st.plotly_chart(fig, use_container_width=True)
+    st.caption(f"{len(view_df)} ברים → {len(candles)} נרות ({chart['bars_per_candle']} ברים לנר) | "
+               f"{chart['raw_points']:,} → {chart['drawn_points']:,} נקודות | "
+               f"מטען לדפדפן: {payload_bytes / 1024:.0f} KB | בניית גרף: {render_ms:.0f} ms")
 
     # --- Gemini Analysis Area ---
     st.markdown("---")
     st.subheader(f"🤖 ניתוח אוטומטי (מבוסס Gemini) - {selected_coin_name}")
     
-    if not GEMINI_ENABLED:
+    # Analyses are stored per quantized technical state (RSI band, side of SMA 50/200, Bollinger status),
+    # so any visitor or engine run that saw the same state has already paid for the model call
+    client, analysis_cache = get_analyst()
+    state = technical_state(last_row, ticker, bar_timeframe)
+    stored = analysis_cache.lookup(state, client)
+    if stored is not None:
+        st.caption(f"ניתוח שמור למצב הטכני הנוכחי (נוצר {stored.get('created_at', '')[:16].replace('T', ' ')} UTC)")
+        st.markdown(stored["text"])
+    elif not GEMINI_ENABLED:
         st.warning("To enable this analysis, set the `GEMINI_API_KEY` in your app's Secrets.")
-    else:
-        # Button to trigger analysis
-        if st.button(f"בקש מ-Gemini לנתח את {selected_coin_name}"):
-            with st.spinner("חושב... Gemini מנתח את הנתונים..."):
-                
-                # Build the Prompt
-                prompt = f"""
-                You are an objective technical crypto market analyst (not a financial advisor).
-                Your job is to interpret cold technical data.
-                
-                Analyze the following data for {selected_coin_name} ({ticker}):
-
-                * **Current Price:** ${last_price:,.2f}
-                * **RSI (14):** {last_rsi:.1f} (Meaning: {rsi_status})
-                * **Relation to SMA 50:** {status_vs_50}
-                * **Relation to SMA 200:** {status_vs_200} (This is a long-term trend indicator)
-                * **Relation to Bollinger Bands:** {bb_status}
-
-                **Your Task:**
-                1. Provide a brief summary (2-3 sentences) of the current technical situation.
-                2. Provide 2-3 bullet points highlighting the strongest Bearish or Bullish signals you see.
-                3. Conclude with a sentence about the expected Volatility (e.g., based on Bollinger Bands).
-                
-                Important: Do not give an explicit Buy/Sell/Hold recommendation. Focus only on interpreting the data.
-                Write the response in Hebrew.
-                """
-                
-                # Call the API
-                analysis = get_gemini_analysis(prompt)
-                
-                # Display the result
-                st.markdown(analysis)
+    elif st.button(f"בקש מ-Gemini לנתח את {selected_coin_name}"):
+        with st.spinner("חושב... Gemini מנתח את הנתונים..."):
+            entry, _ = analysis_cache.analyze(state, client)
+            st.markdown(entry["text"])
 
     # --- Raw Data ---
     st.subheader("נתונים גולמיים")
     st.dataframe(data_df.tail(10))
+    age = data_service.age_seconds(ticker, bar_timeframe)
+    st.caption("נתונים מהמאגר המקומי, מתעדכנים ברקע" if age is None else f"עודכן לפני {age / 60:.0f} דקות")
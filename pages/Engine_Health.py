@@ -0,0 +1,117 @@
+import streamlit as st
+import plotly.graph_objects as go
+import pandas as pd
+from metrics import HEALTH_TABLE, HEALTH_DAYS
+from live_results import get_result_store, auto_refresh
+
+st.set_page_config(layout="wide", page_title="Engine Health")
+st.title("🩺 Engine Health")
+st.markdown(f"Daily timings, downloads, caches and errors of the engine runs over the last {HEALTH_DAYS} days, "
+            "published by the engine with its results.")
+
+# --- SETTINGS ---
+STAGES = ["schedule", "fetch", "indicators", "correlation", "fft", "analysis", "serialize", "alert"]
+
+# --- LOGIC ---
+store = get_result_store()
+
+def load_data():
+    try:
+        # One row per day, run type and timeframe: medians of the runs of that day
+        days = store.table(HEALTH_TABLE).copy()
+        days["day"] = pd.to_datetime(days["day"])
+        return days
+    except FileNotFoundError:
+        return pd.DataFrame()
+    except Exception as e:
+        st.error(f"Error loading data: {e}")
+        return pd.DataFrame()
+
+# --- DISPLAY ---
+days = load_data()
+if days.empty:
+    st.warning(f"No '{HEALTH_TABLE}' table published yet. The engine publishes it after its first run.")
+    auto_refresh(store)
+    st.stop()
+
+kinds = sorted(days["kind"].unique())
+kind = st.sidebar.selectbox("Run type:", kinds, index=kinds.index("once") if "once" in kinds else 0)
+timeframes = sorted(days["timeframe"].unique())
+timeframe = st.sidebar.selectbox("Timeframe:", timeframes, index=timeframes.index("1d") if "1d" in timeframes else 0)
+days = days[(days["kind"] == kind) & (days["timeframe"] == timeframe)].sort_values("day")
+if days.empty:
+    st.warning("No runs of this type and timeframe.")
+    auto_refresh(store)
+    st.stop()
+
+# --- 1. Latest day ---
+last = days.iloc[-1]
+st.subheader(f"Latest Day ({last['day']:%Y-%m-%d} UTC)")
+col1, col2, col3, col4, col5 = st.columns(5)
+col1.metric("Median Duration", f"{last['seconds_p50']:.1f}s",
+            delta=f"{last['seconds_p50'] - days['seconds_p50'].median():+.1f}s vs {HEALTH_DAYS}-day median",
+            delta_color="inverse", help=f"Slowest run: {last['seconds_max']:.1f}s")
+col2.metric("Tickers", f"{last['tickers']:.0f}" if pd.notna(last['tickers']) else "-")
+col3.metric("Errors", f"{last['errors']:.0f}")
+col4.metric("Downloaded", f"{last['fetch_mb']:.2f} MB", help="Median in-memory size of the bars received per run")
+col5.metric("Peak RSS", f"{last['peak_rss_mb']:.0f} MB" if pd.notna(last['peak_rss_mb']) else "-")
+
+stage_cols = [f"stage_{s}" for s in STAGES if f"stage_{s}" in days.columns]
+
+# --- 2. Stage timings over time ---
+st.markdown("---")
+st.subheader("Stage Timings (daily median)")
+fig = go.Figure()
+for col in stage_cols:
+    fig.add_trace(go.Scatter(x=days["day"], y=days[col], name=col.replace("stage_", ""),
+                             mode="lines", stackgroup="stages"))
+fig.update_layout(yaxis_title="Seconds", height=400, hovermode="x unified")
+st.plotly_chart(fig, use_container_width=True)
+
+# Which stage grows with the universe?
+if days["tickers"].nunique() > 1:
+    st.markdown("**Stage time vs. universe size**")
+    fig_scale = go.Figure()
+    for col in stage_cols:
+        fig_scale.add_trace(go.Scatter(x=days["tickers"], y=days[col], name=col.replace("stage_", ""), mode="markers"))
+    fig_scale.update_layout(xaxis_title="Tickers", yaxis_title="Seconds", height=400)
+    st.plotly_chart(fig_scale, use_container_width=True)
+
+# --- 3. Downloads ---
+st.markdown("---")
+st.subheader("Downloads")
+col1, col2 = st.columns(2)
+with col1:
+    fig_lat = go.Figure()
+    fig_lat.add_trace(go.Scatter(x=days["day"], y=days["latency_p50"], name="p50", mode="lines"))
+    fig_lat.add_trace(go.Scatter(x=days["day"], y=days["latency_p95"], name="p95", mode="lines"))
+    fig_lat.update_layout(title="Per-Ticker Fetch Latency", yaxis_title="Seconds", height=350)
+    st.plotly_chart(fig_lat, use_container_width=True)
+with col2:
+    fig_req = go.Figure(go.Bar(x=days["day"], y=days["fetch_requests"]))
+    fig_req.update_layout(title="Requests per Run", height=350)
+    st.plotly_chart(fig_req, use_container_width=True)
+
+# --- 4. Caches, errors, memory ---
+st.markdown("---")
+st.subheader("Caches, Errors and Memory")
+col1, col2, col3 = st.columns(3)
+with col1:
+    fig_cache = go.Figure()
+    for col in [c for c in days.columns if c.startswith("cache_")]:
+        fig_cache.add_trace(go.Scatter(x=days["day"], y=days[col], name=col.replace("cache_", ""), mode="lines"))
+    fig_cache.update_layout(title="Cache Hit Rate", yaxis_title="%", yaxis_range=[0, 105], height=350)
+    st.plotly_chart(fig_cache, use_container_width=True)
+with col2:
+    fig_err = go.Figure(go.Bar(x=days["day"], y=days["errors"], marker_color="red"))
+    fig_err.update_layout(title="Errors per Day", height=350)
+    st.plotly_chart(fig_err, use_container_width=True)
+with col3:
+    fig_rss = go.Figure(go.Scatter(x=days["day"], y=days["peak_rss_mb"], mode="lines"))
+    fig_rss.update_layout(title="Peak RSS", yaxis_title="MB", height=350)
+    st.plotly_chart(fig_rss, use_container_width=True)
+
+with st.expander("Raw daily metrics"):
+    st.dataframe(days.set_index("day"), use_container_width=True)
+
+auto_refresh(store)
@@ -1,20 +1,25 @@
 import streamlit as st
 import pandas as pd
-import json
+from output_store import MANIFEST_FILE
+from live_results import get_result_store, auto_refresh
+from timeframes import TIMEFRAMES, output_name
+from scan_schema import as_scan_table, to_display, DISPLAY_NAMES, SUMMARY_COLUMNS
 
 st.set_page_config(layout="wide", page_title="Market Scanner")
 st.title("📡 Market Scanner")
-st.markdown("This table is automatically updated every 30 minutes by the background engine.")
+st.markdown("This table is automatically updated every 30 minutes by the background engine; the page refreshes itself when it does.")
 
 # --- SETTINGS ---
-DATA_FILE = "market_scan.json"
+DATA_FILE = MANIFEST_FILE
 
 # --- LOGIC ---
-@st.cache_data(ttl=60) # Re-read from disk every 60 seconds
-def load_data():
+store = get_result_store()
+
+def load_data(name):
     try:
-        # Read the JSON created by the engine
-        df = pd.read_json(DATA_FILE)
+        # Arrow table created by the engine (memory-mapped); typed, ticker-indexed.
+        # Parsed once per publish and shared by every session (read-only).
+        df = store.table(name, parse=as_scan_table)
         return df
     except FileNotFoundError:
         st.error(f"Data file '{DATA_FILE}' not found. Please wait for the first automated run or run `5_engine.py` manually.")
@@ -24,7 +29,12 @@ def load_data():
         return pd.DataFrame()
 
 # --- DISPLAY ---
-scan_df = load_data()
+# Timeframes the engine has published a scan for (RSI/SMA lengths are in bars of that timeframe)
+store.refresh()
+published = store.manifest.get("files", {})
+available = [tf for tf in TIMEFRAMES if output_name("market_scan", tf) in published] or ["1d"]
+timeframe = st.sidebar.selectbox("Timeframe:", available, index=available.index("1d") if "1d" in available else 0)
+scan_df = load_data(output_name("market_scan", timeframe))
 
 if not scan_df.empty:
     st.subheader("Latest Scan Results")
@@ -34,29 +44,33 @@ if not scan_df.empty:
     st.sidebar.header("Scanner Filters")
     
     rsi_range = st.sidebar.slider("Filter by RSI range:", 0.0, 100.0, (0.0, 100.0))
-    filtered_df = scan_df[
-        (scan_df['RSI (14)'] >= rsi_range[0]) & 
-        (scan_df['RSI (14)'] <= rsi_range[1])
-    ]
+    # Filters run on the typed columns: float32 compares and categorical codes, no string matching
+    rsi = scan_df['rsi'].to_numpy()
+    keep = (rsi >= rsi_range[0]) & (rsi <= rsi_range[1])
     
-    rsi_signal_filter = st.sidebar.multiselect("Filter by RSI Signal:", 
-                                     options=scan_df['סיגנל RSI'].unique(),
-                                     default=scan_df['סיגנל RSI'].unique())
-    filtered_df = filtered_df[filtered_df['סיגנל RSI'].isin(rsi_signal_filter)]
+    signals = scan_df['rsi_signal'].cat.categories
+    present = [s for s in signals if (scan_df['rsi_signal'] == s).any()]
+    rsi_signal_filter = st.sidebar.multiselect("Filter by RSI Signal:", options=present, default=present)
+    wanted = [signals.get_loc(s) for s in rsi_signal_filter]
+    keep &= scan_df['rsi_signal'].cat.codes.isin(wanted).to_numpy()
+    filtered_df = scan_df[keep]
     
     # --- DISPLAY TABLE ---
+    # Hebrew headers only here, at render time
     st.dataframe(
-        filtered_df.style
+        to_display(filtered_df[SUMMARY_COLUMNS]).style
             .format({
-                "מחיר אחרון": "${:,.2f}",
-                "שינוי יומי (%)": "{:,.2f}%",
-                "RSI (14)": "{:.1f}",
-                "מרחק מ-SMA200 (%)": "{:,.2f}%"
+                DISPLAY_NAMES["close"]: "${:,.2f}",
+                DISPLAY_NAMES["daily_change"]: "{:,.2f}%",
+                DISPLAY_NAMES["rsi"]: "{:.1f}",
+                DISPLAY_NAMES["dist_sma_slow"]: "{:,.2f}%"
             })
             # Cell coloring
-            .background_gradient(cmap='RdYlGn', subset=['RSI (14)'], vmin=30, vmax=70)
-            .background_gradient(cmap='RdYlGn', subset=['שינוי יומי (%)'], vmin=-5, vmax=5)
+            .background_gradient(cmap='RdYlGn', subset=[DISPLAY_NAMES["rsi"]], vmin=30, vmax=70)
+            .background_gradient(cmap='RdYlGn', subset=[DISPLAY_NAMES["daily_change"]], vmin=-5, vmax=5)
     , use_container_width=True)
     
 else:
     st.warning("No data loaded.")
+
+auto_refresh(store)
@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+
+# --- SETTINGS ---
+# The scan table the engine publishes and alerts evaluate: one row per ticker (the index), float32
+# numbers and categorical labels (one small integer code per row instead of a Python string).
+# Column names match indicators.scan_table; the Hebrew headers are only applied when a page renders it.
+RSI_SIGNALS = pd.CategoricalDtype(["Oversold", "Neutral", "Overbought"], ordered=True)
+TRENDS = pd.CategoricalDtype(["Bearish", "Bullish", "Strong Bullish"], ordered=True)
+BB_STATUSES = pd.CategoricalDtype(["touching the lower band", "within the bands", "breaking the upper band"], ordered=True)
+
+SCAN_SCHEMA = {
+    "close": np.float32,
+    "daily_change": np.float32,
+    "rsi": np.float32,
+    "rsi_signal": RSI_SIGNALS,
+    "trend": TRENDS,
+    "dist_sma_slow": np.float32,
+    # Indicator levels: not shown by the scanner page, but alert rules can use them
+    "sma_fast": np.float32,
+    "sma_slow": np.float32,
+    "bb_lower": np.float32,
+    "bb_upper": np.float32,
+    "bb_status": BB_STATUSES,
+}
+SUMMARY_COLUMNS = ["close", "daily_change", "rsi", "rsi_signal", "trend", "dist_sma_slow"]   # Scanner page
+INDEX_NAME = "ticker"
+
+DISPLAY_NAMES = {
+    "ticker": "מטבע",
+    "close": "מחיר אחרון",
+    "daily_change": "שינוי יומי (%)",   # A 24h change on every timeframe (bars_per_day back)
+    "rsi": "RSI (14)",
+    "rsi_signal": "סיגנל RSI",
+    "trend": "מגמה",
+    "dist_sma_slow": "מרחק מ-SMA200 (%)",
+    "sma_fast": "SMA50",
+    "sma_slow": "SMA200",
+    "bb_lower": "רצועת בולינגר תחתונה",
+    "bb_upper": "רצועת בולינגר עליונה",
+    "bb_status": "מצב בולינגר",
+}
+INTERNAL_NAMES = {display: name for name, display in DISPLAY_NAMES.items()}
+
+
+# --- FUNCTION: BUILD / NORMALIZE ---
+def scan_frame(table):
+    # indicators.scan_table or StreamingIndicators.latest -> the typed scan table
+    df = table[list(SCAN_SCHEMA)].astype(SCAN_SCHEMA)
+    df.index = pd.Index(table.index, name=INDEX_NAME)
+    return df
+
+
+def empty_scan():
+    # Typed table without rows (no bars for any ticker)
+    return pd.DataFrame({name: pd.Series(dtype=dtype) for name, dtype in SCAN_SCHEMA.items()},
+                        index=pd.Index([], dtype=object, name=INDEX_NAME))
+
+
+def as_scan_table(df):
+    # Published table in either layout (typed, or the older Hebrew-headed one) -> typed scan table
+    # Columns added to the schema later are NaN in tables published before them
+    if INDEX_NAME not in df.columns and df.index.name == INDEX_NAME:
+        return df.reindex(columns=list(SCAN_SCHEMA)).astype(SCAN_SCHEMA)
+    df = df.rename(columns=INTERNAL_NAMES).set_index(INDEX_NAME)
+    return df.reindex(columns=list(SCAN_SCHEMA)).astype(SCAN_SCHEMA)
+
+
+def column_name(name):
+    # Internal column for a column or display name (alert rules written against the Hebrew headers)
+    return INTERNAL_NAMES.get(name, name)
+
+
+# --- FUNCTION: RENDER ---
+def to_display(df):
+    # Ticker index back to a column, Hebrew headers; categorical labels render as their text
+    return df.reset_index().rename(columns=DISPLAY_NAMES)
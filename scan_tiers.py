@@ -0,0 +1,144 @@
+import os
+import json
+from datetime import datetime, timezone, timedelta
+import numpy as np
+from indicators import RSI_OVERBOUGHT, RSI_OVERSOLD
+from alerts import load_rules
+from timeframes import DEFAULT_TIMEFRAME, bar_minutes
+from scan_schema import column_name
+
+# --- SETTINGS ---
+SCHEDULE_FILE = os.path.join("bar_store", "scan_schedule_{timeframe}.json")   # Cached with the bar store in CI
+# Refresh tiers, checked in order: a ticker gets the first tier whose urgency it reaches.
+# Urgency is max(volatility / VOL_HIGH, NEAR_DISTANCE / distance to the nearest threshold).
+TIERS = [
+    {"name": "hot", "min_urgency": 1.0, "every_minutes": 30},
+    {"name": "warm", "min_urgency": 0.4, "every_minutes": 120},
+    {"name": "cold", "min_urgency": 0.0, "every_minutes": 480},
+]
+DUE_SLACK = 0.1              # A ticker is due at 90% of its interval, so cron jitter does not skip a slot
+VOL_WINDOW = 30              # Bars of log returns for realized volatility
+VOL_HIGH = 0.05              # Per-bar volatility of daily bars that counts as "volatile"; scaled by sqrt(bar length)
+NEAR_DISTANCE = {            # Distance to a threshold that counts as "at the threshold", per scan column
+    "rsi": 5.0,              # RSI points
+    "dist_sma_slow": 2.0,    # Percent from the SMA200
+}
+ALWAYS_REFRESH = ["BTC-USD"]  # Reference coin of the correlation and FFT stages: refreshed on every run
+REQUEST_BUDGET = int(os.environ.get("ENGINE_SCAN_BUDGET", 240))   # Ticker refreshes allowed per rolling hour
+HISTORY_RUNS = 500           # Runs kept for the savings report
+
+# The thresholds run_market_scanner labels on (RSI 30/70, the SMA200 crossover) plus those of the
+# alert rules; a coin near any of them is scanned often, a quiet coin far from all of them rarely.
+
+
+# --- URGENCY ---
+def thresholds():
+    found = {"rsi": {RSI_OVERSOLD, RSI_OVERBOUGHT}, "dist_sma_slow": {0.0}}
+    for rule in load_rules():
+        column = column_name(rule["column"])
+        if column in found:
+            found[column].add(float(rule["threshold"]))
+    return {column: np.array(sorted(values)) for column, values in found.items()}
+
+
+def realized_volatility(closes, window=VOL_WINDOW):
+    # closes: wide frame (bars x tickers) -> std of the last `window` log returns per ticker
+    returns = np.diff(np.log(closes.to_numpy(dtype=float)[-(window + 1):]), axis=0)
+    counts = np.isfinite(returns).sum(axis=0)
+    with np.errstate(invalid='ignore'):
+        vol = np.nanstd(returns, axis=0)
+    return dict(zip(closes.columns, np.where(counts >= 2, vol, np.nan)))
+
+
+def urgency(scan_df, volatility, timeframe=DEFAULT_TIMEFRAME):
+    # scan_df: last published typed scan (may miss tickers); volatility: {ticker: per-bar std}
+    vol_high = VOL_HIGH * np.sqrt(bar_minutes(timeframe) / 1440)
+    levels = thresholds()
+    scores = {}
+    for ticker, vol in volatility.items():
+        score = vol / vol_high if np.isfinite(vol) else np.inf
+        if scan_df is None or ticker not in scan_df.index:
+            score = np.inf   # Never scanned: as urgent as it gets
+        else:
+            row = scan_df.loc[ticker]
+            for column, values in levels.items():
+                distance = np.min(np.abs(float(row[column]) - values))
+                score = max(score, NEAR_DISTANCE[column] / max(distance, 1e-9))
+        scores[ticker] = float(score)
+    return scores
+
+
+def tier_for(score):
+    for tier in TIERS:
+        if score >= tier["min_urgency"]:
+            return tier
+    return TIERS[-1]
+
+
+# --- SCHEDULER ---
+class ScanSchedule:
+    def __init__(self, timeframe=DEFAULT_TIMEFRAME, budget=REQUEST_BUDGET):
+        self.timeframe = timeframe
+        self.budget = budget
+        self.path = SCHEDULE_FILE.format(timeframe=timeframe)
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            data = {}
+        self.last_scanned = data.get("last_scanned", {})   # ticker -> iso time of its last refresh
+        self.spent = data.get("spent", [])                 # [iso time, refreshes] of the last hour (budget)
+        self.history = data.get("history", [])             # Per run: universe size and tickers refreshed
+
+    def plan(self, tickers, scan_df, volatility, now=None, always=ALWAYS_REFRESH):
+        # Tickers to refresh this run: every due ticker, `always` and then most urgent first, within the hourly budget
+        now = now or datetime.now(timezone.utc)
+        scores = urgency(scan_df, volatility, self.timeframe)
+        hour_ago = (now - timedelta(hours=1)).isoformat()
+        self.spent = [s for s in self.spent if s[0] > hour_ago]
+        available = max(self.budget - sum(n for _, n in self.spent), 0)
+
+        due, tiers = [], {}
+        for ticker in tickers:
+            tier = tier_for(scores.get(ticker, np.inf))
+            tiers[ticker] = tier["name"]
+            last = self.last_scanned.get(ticker)
+            interval = timedelta(minutes=tier["every_minutes"] * (1 - DUE_SLACK))
+            if ticker in always or last is None or datetime.fromisoformat(last) + interval <= now:
+                due.append(ticker)
+        # Most urgent first; the rest stay due and go first next time once they are more overdue
+        due.sort(key=lambda t: (t not in always, -scores.get(t, np.inf)))
+        selected = due[:available]
+        return {"refresh": selected, "deferred": due[available:], "tiers": tiers, "scores": scores}
+
+    def record(self, plan, universe, now=None):
+        now = (now or datetime.now(timezone.utc)).isoformat()
+        for ticker in plan["refresh"]:
+            self.last_scanned[ticker] = now
+        self.spent.append([now, len(plan["refresh"])])
+        self.history = (self.history + [{"at": now, "universe": universe, "refreshed": len(plan["refresh"])}])[-HISTORY_RUNS:]
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"last_scanned": self.last_scanned, "spent": self.spent, "history": self.history}, f, indent=1)
+        os.replace(tmp_path, self.path)
+
+    # --- SAVINGS VS. A UNIFORM SCAN ---
+    def report(self, plan, universe):
+        # A uniform scan refreshes (downloads + recomputes) every ticker on every run
+        counts = {tier["name"]: 0 for tier in TIERS}
+        for name in plan["tiers"].values():
+            counts[name] += 1
+        refreshed = len(plan["refresh"])
+        total_uniform = sum(h["universe"] for h in self.history)
+        total_refreshed = sum(h["refreshed"] for h in self.history)
+        print(f"... Adaptive scan: {refreshed}/{universe} tickers refreshed "
+              f"({', '.join(f'{n} {name}' for name, n in counts.items())}; {len(plan['deferred'])} deferred by the budget)")
+        print(f"    saved vs. uniform scan: {universe - refreshed} ticker fetches + indicator passes this run "
+              f"({1 - refreshed / max(universe, 1):.0%}), "
+              f"{1 - total_refreshed / max(total_uniform, 1):.0%} over the last {len(self.history)} run(s)")
+        return {"refreshed": refreshed, "skipped": universe - refreshed, "deferred": len(plan["deferred"]),
+                "tiers": counts, "saved_fraction": 1 - refreshed / max(universe, 1),
+                "saved_fraction_history": 1 - total_refreshed / max(total_uniform, 1)}
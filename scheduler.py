@@ -0,0 +1,75 @@
+import time
+import signal
+import threading
+from datetime import datetime
+
+# Minimal in-process scheduler for the engine daemon.
+# Every job runs on its own thread at a fixed interval. If a job is still running when its
+# next tick comes, that tick is skipped (never queued), so a slow job cannot pile up runs.
+
+
+class Job:
+    def __init__(self, name, func, interval_seconds, run_at_start=True):
+        self.name = name
+        self.func = func
+        self.interval = interval_seconds
+        self.next_run = time.monotonic() if run_at_start else time.monotonic() + interval_seconds
+        self.thread = None
+        self.runs = 0
+        self.skipped = 0
+        self.failures = 0
+        self.last_duration = None
+
+    def is_running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def _run(self):
+        start = time.perf_counter()
+        try:
+            self.func()
+            self.runs += 1
+        except Exception as e:
+            self.failures += 1
+            print(f"!!! Job '{self.name}' failed: {e}")
+        self.last_duration = time.perf_counter() - start
+        print(f"[{datetime.now():%H:%M:%S}] Job '{self.name}' finished in {self.last_duration:.1f}s")
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name=f"job-{self.name}", daemon=True)
+        self.thread.start()
+
+
+def run_scheduler(jobs, stop_event=None, poll_seconds=1.0):
+    stop_event = stop_event or threading.Event()
+
+    # Graceful shutdown on Ctrl+C / SIGTERM: stop scheduling, let running jobs finish
+    def request_stop(signum, frame):
+        print(f"\nReceived signal {signum}, shutting down after running jobs finish...")
+        stop_event.set()
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGINT, request_stop)
+        signal.signal(signal.SIGTERM, request_stop)
+
+    print("Scheduler started with jobs: " + ", ".join(f"{j.name} (every {j.interval:.0f}s)" for j in jobs))
+    while not stop_event.is_set():
+        now = time.monotonic()
+        for job in jobs:
+            if now < job.next_run:
+                continue
+            # Keep the original cadence: the next tick is counted from the planned time
+            while job.next_run <= now:
+                job.next_run += job.interval
+            if job.is_running():
+                job.skipped += 1
+                print(f"[{datetime.now():%H:%M:%S}] Job '{job.name}' still running, skipping this tick")
+                continue
+            print(f"[{datetime.now():%H:%M:%S}] Starting job '{job.name}'")
+            job.start()
+        stop_event.wait(poll_seconds)
+
+    for job in jobs:
+        if job.is_running():
+            job.thread.join()
+    for job in jobs:
+        print(f"Job '{job.name}': {job.runs} run(s), {job.skipped} skipped tick(s), {job.failures} failure(s)")
+    print("Scheduler stopped.")
@@ -0,0 +1,175 @@
+import os
+import glob
+import hashlib
+import threading
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from lazy_import import lazy_module
+from metrics import cache_hit
+
+scipy_signal = lazy_module("scipy.signal")
+
+# --- SETTINGS ---
+MIN_BARS = 100              # Minimum history for a meaningful spectrum
+MIN_PERIOD = 7              # Cycle band kept in the output, in bars of the engine's timeframe
+MAX_PERIOD = 365
+WELCH_SEGMENT = 256         # Welch segment length (shorter = smoother but coarser)
+SPECTROGRAM_WINDOW = 180    # Sliding-window length of the spectrogram
+SPECTROGRAM_STEP = 15       # Bars between spectrogram columns
+CACHE_DIR = os.path.join("cache", "spectral")
+CACHE_KEEP = 20             # Spectra files kept on disk (oldest are evicted)
+MEMORY_KEEP = 2             # Spectra kept in memory (the daemon's current and previous snapshot)
+
+_memory_cache = {}          # key -> spectra, least recently used first
+_memory_lock = threading.Lock()
+
+
+# --- HELPERS ---
+def fingerprint(values, tickers, **params):
+    # Same prices, same tickers, same settings -> same key -> spectra are reused, not recomputed
+    digest = hashlib.sha1(np.ascontiguousarray(values).tobytes())
+    digest.update("|".join(tickers).encode())
+    digest.update(repr(sorted(params.items())).encode())
+    return digest.hexdigest()
+
+
+def common_window(closes, min_bars=MIN_BARS):
+    # Trailing block where every kept ticker has data; tickers with too little history are dropped
+    values = closes.to_numpy(dtype=float)
+    valid = np.isfinite(values)
+    trailing = np.argmin(valid[::-1], axis=0)
+    trailing[valid.all(axis=0)] = len(values)
+    keep = trailing >= min_bars
+    if not keep.any():
+        return None, []
+    length = trailing[keep].min()
+    return values[-length:, keep], list(closes.columns[keep])
+
+
+def band_mask(freqs):
+    with np.errstate(divide='ignore'):
+        periods = np.where(freqs > 0, 1.0 / freqs, np.inf)
+    return periods, (periods >= MIN_PERIOD) & (periods <= MAX_PERIOD)
+
+
+def dominant_peaks(power):
+    # Local maxima above mean + std, for every ticker column at once (find_peaks with a height)
+    threshold = power.mean(axis=0) + power.std(axis=0)
+    inner = power[1:-1]
+    is_peak = (inner > power[:-2]) & (inner >= power[2:]) & (inner > threshold)
+    return np.vstack([np.zeros((1, power.shape[1]), bool), is_peak, np.zeros((1, power.shape[1]), bool)])
+
+
+# --- CORE: BATCHED SPECTRA ---
+def amplitude_spectrum(values):
+    # One 2-D rfft over all tickers; same scaling as the original single-coin FFT (2/N * |X|)
+    n = len(values)
+    spectrum = np.fft.rfft(values - values.mean(axis=0), axis=0)[:n // 2]
+    freqs = np.fft.rfftfreq(n, 1)[:n // 2]
+    return freqs[1:], 2.0 / n * np.abs(spectrum[1:])
+
+
+def welch_spectrum(values):
+    freqs, density = scipy_signal.welch(values, fs=1.0, nperseg=min(WELCH_SEGMENT, len(values)), axis=0)
+    return freqs[1:], density[1:]
+
+
+def spectrogram(values, window=SPECTROGRAM_WINDOW, step=SPECTROGRAM_STEP):
+    # Sliding windows (segments x tickers x window) -> one rfft along the last axis
+    window = min(window, len(values))
+    ends = np.arange(len(values) - 1, window - 2, -step)[::-1]   # Last bar of every segment, newest included
+    segments = sliding_window_view(values, window, axis=0)[ends - (window - 1)]
+    segments = segments - segments.mean(axis=-1, keepdims=True)
+    spectrum = np.abs(np.fft.rfft(segments * np.hanning(window), axis=-1)) * 2.0 / window
+    freqs = np.fft.rfftfreq(window, 1)
+    return freqs[1:], spectrum[..., 1:], ends
+
+
+# --- FUNCTION: FULL SPECTRAL ANALYSIS (CACHED) ---
+def spectral_analysis(closes, date_format="%Y-%m-%d"):
+    values, tickers = common_window(closes)
+    if values is None:
+        raise ValueError(f"Not enough data for FFT analysis (minimum {MIN_BARS} bars)")
+
+    key = fingerprint(values, tickers, min_period=MIN_PERIOD, max_period=MAX_PERIOD, welch=WELCH_SEGMENT,
+                      window=SPECTROGRAM_WINDOW, step=SPECTROGRAM_STEP, dates=date_format)
+    cached = load_cached(key)
+    cache_hit("spectral", cached is not None)
+    if cached is not None:
+        print("... Spectra unchanged, using cache")
+        return cached
+
+    freqs, amplitude = amplitude_spectrum(values)
+    periods, mask = band_mask(freqs)
+    amplitude = amplitude[mask]
+    peaks = dominant_peaks(amplitude)
+
+    welch_freqs, density = welch_spectrum(values)
+    welch_periods, welch_mask = band_mask(welch_freqs)
+
+    sg_freqs, sg_power, sg_ends = spectrogram(values)
+    sg_periods, sg_mask = band_mask(sg_freqs)
+
+    dates = closes.index[-len(values):]
+    result = {
+        "tickers": tickers,
+        "periods": periods[mask],
+        "amplitude": amplitude.T.astype(np.float32),                       # tickers x periods
+        "dominant": [sorted(periods[mask][peaks[:, i]].tolist(), reverse=True) for i in range(len(tickers))],
+        "welch_periods": welch_periods[welch_mask],
+        "welch_density": density[welch_mask].T.astype(np.float32),         # tickers x periods
+        "spectrogram_periods": sg_periods[sg_mask],
+        "spectrogram_dates": dates[sg_ends].strftime(date_format).tolist(),
+        "spectrogram": sg_power[:, :, sg_mask].transpose(1, 0, 2).astype(np.float32),  # tickers x time x periods
+        "bars": len(values),
+    }
+    save_cached(key, result)
+    return result
+
+
+# --- CACHE (MEMORY + DISK) ---
+def remember(key, result):
+    # Most recent last; evict the least recently used beyond MEMORY_KEEP
+    with _memory_lock:
+        _memory_cache.pop(key, None)
+        _memory_cache[key] = result
+        while len(_memory_cache) > MEMORY_KEEP:
+            del _memory_cache[next(iter(_memory_cache))]
+
+
+def load_cached(key):
+    result = _memory_cache.get(key)
+    if result is not None:
+        remember(key, result)
+        return result
+    path = os.path.join(CACHE_DIR, f"{key}.npz")
+    if not os.path.exists(path):
+        return None
+    with np.load(path, allow_pickle=False) as saved:
+        result = {name: saved[name] for name in saved.files}
+    result["tickers"] = result["tickers"].tolist()
+    result["spectrogram_dates"] = result["spectrogram_dates"].tolist()
+    result["bars"] = int(result["bars"])
+    # Ragged per-ticker peak lists are stored flat with offsets
+    offsets = result.pop("dominant_offsets")
+    flat = result.pop("dominant_flat").tolist()
+    result["dominant"] = [flat[a:b] for a, b in zip(offsets[:-1], offsets[1:])]
+    remember(key, result)
+    return result
+
+
+def save_cached(key, result):
+    remember(key, result)
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    arrays = {k: v for k, v in result.items() if k != "dominant"}
+    arrays["dominant_offsets"] = np.cumsum([0] + [len(p) for p in result["dominant"]])
+    arrays["dominant_flat"] = np.array([p for peaks in result["dominant"] for p in peaks], dtype=float)
+    path = os.path.join(CACHE_DIR, f"{key}.npz")
+    tmp_path = path + ".tmp.npz"
+    np.savez_compressed(tmp_path, **arrays)
+    os.replace(tmp_path, path)
+
+    # Evict the oldest spectra beyond CACHE_KEEP
+    files = sorted(glob.glob(os.path.join(CACHE_DIR, "*.npz")), key=os.path.getmtime)
+    for old in files[:-CACHE_KEEP]:
+        os.remove(old)
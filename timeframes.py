@@ -0,0 +1,102 @@
+import os
+import numpy as np
+import pandas as pd
+from bar_store import update_store, load_bars
+
+# --- SETTINGS ---
+DEFAULT_TIMEFRAME = os.environ.get("ENGINE_TIMEFRAME", "1d")
+
+# Every timeframe is read from a stored "source" interval. Timeframes whose source is a finer
+# interval are built by resampling the stored bars, not downloaded separately.
+#   history: what is pulled the first time a stored interval is seen (Yahoo keeps 1m bars for
+#            about a week and 5m bars for 60 days, so intraday history is short by nature)
+#   minutes: bar length; RSI/SMA/FFT lengths are in bars, this converts them to wall time
+TIMEFRAMES = {
+    "1m": {"source": "1m", "history": "5d", "minutes": 1},
+    "5m": {"source": "5m", "history": "1mo", "minutes": 5},
+    "15m": {"source": "5m", "minutes": 15},
+    "1h": {"source": "5m", "minutes": 60},
+    "1d": {"source": "1d", "history": "2y", "minutes": 1440},
+}
+
+
+# --- HELPERS ---
+def check_timeframe(timeframe):
+    if timeframe not in TIMEFRAMES:
+        raise ValueError(f"Unsupported timeframe '{timeframe}' (use one of {', '.join(TIMEFRAMES)})")
+    return TIMEFRAMES[timeframe]
+
+
+def source_interval(timeframe):
+    return check_timeframe(timeframe)["source"]
+
+
+def bar_minutes(timeframe):
+    return check_timeframe(timeframe)["minutes"]
+
+
+def bars_per_day(timeframe):
+    # Bars spanning 24 hours: the scanner's "daily change" looks this far back on every timeframe
+    return max(1, 1440 // bar_minutes(timeframe))
+
+
+def is_intraday(timeframe):
+    return bar_minutes(timeframe) < 1440
+
+
+def date_format(timeframe):
+    return "%Y-%m-%d %H:%M" if is_intraday(timeframe) else "%Y-%m-%d"
+
+
+def output_name(base, timeframe):
+    # Daily results keep their original names; other timeframes get a suffix
+    return base if timeframe == "1d" else f"{base}_{timeframe}"
+
+
+# --- CORE: VECTORIZED OHLCV RESAMPLING ---
+def resample_bars(df, timeframe):
+    # Buckets are fixed-length spans counted from the epoch (UTC), so they line up across tickers.
+    # One pass of reduceat per column instead of a groupby per bucket.
+    if df.empty or source_interval(timeframe) == timeframe:
+        return df
+    df = df[np.isfinite(df['Close'].to_numpy(dtype=float))]
+    step = pd.Timedelta(minutes=bar_minutes(timeframe)).value
+    keys = df.index.as_unit("ns").asi8 // step
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    ends = np.append(starts[1:], len(keys)) - 1
+    index = pd.DatetimeIndex(pd.to_datetime(keys[starts] * step, utc=df.index.tz is not None), name=df.index.name)
+    if df.index.tz is not None:
+        index = index.tz_convert(df.index.tz)
+    return pd.DataFrame({
+        'Open': df['Open'].to_numpy(dtype=float)[starts],
+        'High': np.fmax.reduceat(df['High'].to_numpy(dtype=float), starts),
+        'Low': np.fmin.reduceat(df['Low'].to_numpy(dtype=float), starts),
+        'Close': df['Close'].to_numpy(dtype=float)[ends],
+        'Volume': np.add.reduceat(np.nan_to_num(df['Volume'].to_numpy(dtype=float)), starts),
+    }, index=index)
+
+
+# --- FUNCTION: STORE ACCESS PER TIMEFRAME ---
+def update_timeframe_store(tickers, timeframe=DEFAULT_TIMEFRAME, on_update=None, mode=None):
+    # Updates the source interval; on_update(ticker, bars) gets the bars already in `timeframe`
+    source = source_interval(timeframe)
+
+    def resampled(ticker, bars):
+        on_update(ticker, resample_bars(bars, timeframe))
+
+    update_store(tickers, interval=source, history=TIMEFRAMES[source]["history"], mode=mode,
+                 on_update=resampled if on_update is not None else None)
+
+
+def load_timeframe_bars(ticker, timeframe=DEFAULT_TIMEFRAME, bars=None):
+    df = resample_bars(load_bars(ticker, interval=source_interval(timeframe)), timeframe)
+    return df.iloc[-bars:] if bars else df
+
+
+def load_timeframe_closes(tickers, timeframe=DEFAULT_TIMEFRAME, bars=None):
+    closes = {}
+    for ticker in tickers:
+        df = load_timeframe_bars(ticker, timeframe, bars)
+        if not df.empty:
+            closes[ticker] = df['Close']
+    return pd.DataFrame(closes)